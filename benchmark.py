@@ -0,0 +1,219 @@
+"""Benchmark throughput, latensi, dan memori mesin inferensi dengan profil siswa sintetis.
+"""
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from expert_system import CLI
+from recommender_core import GRADE_FIELDS, IndexedInferenceEngine, InferenceEngine, KnowledgeBase, Recommender
+
+
+DEFAULT_SIZES = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+NEUTRAL_GOALS = ("guru", "pilot", "atlet", "wirausaha", "belum tahu", "")
+STARTUP_FACTS = {
+    "interests": {"Social", "Investigative"},
+    "math": 75.0,
+    "physics": 70.0,
+    "biology": 95.0,
+    "chemistry": 92.0,
+    "language": 80.0,
+    "learning_style": "auditori",
+    "environment": "riset",
+    "career_goal": "dokter spesialis",
+}
+STARTUP_SNIPPET = """
+import time
+started = time.perf_counter()
+import recommender_core
+imported = time.perf_counter()
+recommender_core.build_recommender().recommend({facts!r})
+finished = time.perf_counter()
+print((imported - started) * 1e3, (finished - started) * 1e3)
+"""
+
+
+def generate_profiles(count: int, seed: int = 0, kb: Optional[KnowledgeBase] = None) -> Iterator[Dict[str, object]]:
+    rng = random.Random(seed)
+    kb = kb or KnowledgeBase()
+    interests = sorted(CLI.VALID_INTERESTS)
+    styles = sorted(CLI.VALID_STYLES)
+    environments = sorted(CLI.VALID_ENVIRONMENTS)
+    keywords = list(kb.keyword_index.keywords)
+    for _ in range(count):
+        goal_words = rng.sample(keywords, rng.randint(0, 2)) + [rng.choice(NEUTRAL_GOALS)]
+        rng.shuffle(goal_words)
+        yield {
+            "interests": set(rng.sample(interests, rng.randint(1, 3))),
+            **{subject: float(rng.randint(0, 100)) for subject in GRADE_FIELDS},
+            "learning_style": rng.choice(styles),
+            "environment": rng.choice(environments),
+            "career_goal": " ".join(word for word in goal_words if word).lower(),
+        }
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _time_calls(
+    call: Callable[[object], object], items: Sequence[object], batched: bool = False
+) -> Dict[str, object]:
+    clock = time.perf_counter_ns
+    latencies: List[int] = []
+    per_student: List[float] = []
+    started = clock()
+    for item in items:
+        before = clock()
+        call(item)
+        latency = clock() - before
+        latencies.append(latency)
+        if batched:
+            per_student.append(latency / len(item))
+    elapsed = (clock() - started) / 1e9
+    latencies.sort()
+    result: Dict[str, object] = {"seconds": round(elapsed, 6), "calls": len(items)}
+    if batched:
+        per_student.sort()
+        result["latency_p50_us"] = round(_percentile(per_student, 0.50) / 1e3, 3)
+        result["latency_p99_us"] = round(_percentile(per_student, 0.99) / 1e3, 3)
+        result["per_chunk"] = {
+            "latency_p50_us": round(_percentile(latencies, 0.50) / 1e3, 3),
+            "latency_p99_us": round(_percentile(latencies, 0.99) / 1e3, 3),
+        }
+    else:
+        result["latency_p50_us"] = round(_percentile(latencies, 0.50) / 1e3, 3)
+        result["latency_p99_us"] = round(_percentile(latencies, 0.99) / 1e3, 3)
+    return result
+
+
+def _peak_memory(call: Callable[[object], object], items: Sequence[object]) -> int:
+    tracemalloc.start()
+    try:
+        for item in items:
+            call(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def benchmark_cases(kb: KnowledgeBase) -> Dict[str, Callable[[object], object]]:
+    scan = InferenceEngine(kb)
+    indexed = IndexedInferenceEngine(kb)
+    optimized = InferenceEngine(kb)
+    optimized.optimize(generate_profiles(1_000, seed=-1, kb=kb))
+    recommender = Recommender(kb, scan)
+    return {
+        "infer/scan": scan.infer,
+        "infer/indexed": indexed.infer,
+        "infer_compact/scan": scan.infer_compact,
+        "infer_compact/optimized": optimized.infer_compact,
+        "recommend": recommender.recommend,
+        "recommend/compact": lambda facts: recommender.recommend(facts, explain=False),
+        "recommend_batch": lambda chunk: recommender.recommend_batch(chunk, explain=False),
+    }
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    seed: int = 0,
+    chunk_size: int = 1024,
+    cases: Optional[Sequence[str]] = None,
+    measure_memory: bool = True,
+) -> Dict[str, object]:
+    kb = KnowledgeBase()
+    available = benchmark_cases(kb)
+    selected = list(cases or available)
+    unknown = sorted(set(selected) - set(available))
+    if unknown:
+        raise ValueError(f"Kasus benchmark tidak dikenal: {', '.join(unknown)}")
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        profiles = list(generate_profiles(size, seed, kb))
+        chunks = [profiles[i : i + chunk_size] for i in range(0, size, chunk_size)]
+        for name in selected:
+            call = available[name]
+            batched = name == "recommend_batch"
+            items = chunks if batched else profiles
+            row: Dict[str, object] = {"case": name, "size": size}
+            row.update(_time_calls(call, items, batched))
+            row["throughput_per_s"] = round(size / row["seconds"], 1) if row["seconds"] else None
+            if measure_memory:
+                row["peak_memory_bytes"] = _peak_memory(call, items)
+            results.append(row)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "chunk_size": chunk_size,
+        "rules": len(kb.rules),
+        "results": results,
+    }
+
+
+def run_startup_benchmark(runs: int = 20) -> Dict[str, object]:
+    code = STARTUP_SNIPPET.format(facts=STARTUP_FACTS)
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples: Dict[str, List[float]] = {"import_ms": [], "first_recommendation_ms": [], "process_ms": []}
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True
+        ).stdout
+        samples["process_ms"].append((time.perf_counter() - started) * 1e3)
+        import_ms, first_ms = (float(value) for value in output.split())
+        samples["import_ms"].append(import_ms)
+        samples["first_recommendation_ms"].append(first_ms)
+    summary: Dict[str, object] = {}
+    for name, values in samples.items():
+        values.sort()
+        summary[name] = {"p50": round(_percentile(values, 0.50), 3), "p99": round(_percentile(values, 0.99), 3)}
+    return {"python": platform.python_version(), "platform": platform.platform(), "runs": runs, "startup": summary}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark mesin inferensi expert system.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="ukuran batch, pisahkan koma")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--case", action="append", dest="cases", help="jalankan kasus tertentu saja")
+    parser.add_argument("--no-memory", action="store_true", help="lewati pengukuran memori puncak")
+    parser.add_argument("--output", default="-", help="file JSON hasil ('-' untuk stdout)")
+    parser.add_argument(
+        "--startup",
+        type=int,
+        metavar="RUNS",
+        help="ukur waktu cold start sampai rekomendasi pertama dengan RUNS proses baru",
+    )
+    args = parser.parse_args()
+
+    if args.startup:
+        report = run_startup_benchmark(args.startup)
+    else:
+        report = run_benchmark(
+            sizes=[int(size) for size in args.sizes.split(",") if size],
+            seed=args.seed,
+            chunk_size=args.chunk_size,
+            cases=args.cases,
+            measure_memory=not args.no_memory,
+        )
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,441 +1,152 @@
 """CLI expert system untuk rekomendasi jurusan kuliah berbasis forward chaining.
 """
+from array import array
+from bisect import bisect_right
+from collections import deque
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Set, Tuple
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
+import argparse
+import asyncio
+import codecs
+import concurrent.futures
+import contextlib
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import struct
 import sys
-import unittest
+import zlib
 
+from recommender_core import (
+    GRADE_FIELDS,
+    SNAPSHOT_FORMAT,
+    SNAPSHOT_SUFFIXES,
+    BatchInferenceEngine,
+    Clause,
+    ClauseStatistics,
+    EvaluationPlan,
+    FiredRule,
+    IndexedInferenceEngine,
+    InferenceEngine,
+    KeywordIndex,
+    KnowledgeBase,
+    MultiTenantRecommender,
+    Predicate,
+    ProfiledInferenceEngine,
+    RecommendationCache,
+    RecommendationSession,
+    Recommender,
+    Rule,
+    RuleProfiler,
+    StudentBatch,
+    _set_bits,
+    build_recommender,
+    clause_facts,
+    compile_clause,
+    default_knowledge_base,
+    facts_key,
+    plan_evaluation_order,
+)
 
-@dataclass
-class Rule:
-    name: str
-    major: str
-    weight: float
-    condition: Callable[[Dict[str, object]], Tuple[bool, str]]
-
-
-class KnowledgeBase:
-    def __init__(self) -> None:
-        self.rules: List[Rule] = self._build_rules()
-        self.total_weight_per_major: Dict[str, float] = self._compute_total_weights()
-
-    def _build_rules(self) -> List[Rule]:
-        return [
-            Rule(
-                name="TI-Interes-Investigative",
-                major="Teknik Informatika",
-                weight=0.25,
-                condition=lambda f: (
-                    "Investigative" in f["interests"] and f["math"] >= 85,
-                    "Minat Investigative dan nilai Matematika tinggi mendukung logika pemrograman.",
-                ),
-            ),
-            Rule(
-                name="TI-Environment-Industry",
-                major="Teknik Informatika",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] in {"industri", "riset"},
-                    "Preferensi lingkungan industri/riset cocok dengan proyek pengembangan perangkat lunak.",
-                ),
-            ),
-            Rule(
-                name="TI-Career-Tech",
-                major="Teknik Informatika",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["developer", "software", "data", "AI", "robot"]),
-                    "Tujuan karier di bidang teknologi sesuai dengan proyeksi TI.",
-                ),
-            ),
-            Rule(
-                name="TI-Creative-Blend",
-                major="Teknik Informatika",
-                weight=0.15,
-                condition=lambda f: (
-                    f["environment"] == "kreatif" and "Artistic" in f["interests"],
-                    "Kombinasi lingkungan kreatif dan minat Artistic membuka jalur UI/UX dan front-end.",
-                ),
-            ),
-            Rule(
-                name="SI-Structured",
-                major="Sistem Informasi",
-                weight=0.25,
-                condition=lambda f: (
-                    "Conventional" in f["interests"] and f["math"] >= 75,
-                    "Minat Conventional dan dasar Matematika memadai untuk analisis sistem.",
-                ),
-            ),
-            Rule(
-                name="SI-Industry",
-                major="Sistem Informasi",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] == "industri",
-                    "Preferensi industri cocok dengan penerapan SI di organisasi.",
-                ),
-            ),
-            Rule(
-                name="SI-Career-BusinessIT",
-                major="Sistem Informasi",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["analyst", "bisnis", "system"]),
-                    "Tujuan karier analisis sistem/teknologi bisnis mendukung SI.",
-                ),
-            ),
-            Rule(
-                name="Elektro-STEM",
-                major="Teknik Elektro",
-                weight=0.3,
-                condition=lambda f: (
-                    "Realistic" in f["interests"] and f["math"] >= 80 and f["physics"] >= 80,
-                    "Minat Realistic dan nilai Matematika/Fisika tinggi penting untuk rekayasa listrik.",
-                ),
-            ),
-            Rule(
-                name="Elektro-Riset",
-                major="Teknik Elektro",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] in {"industri", "riset"},
-                    "Preferensi riset/industri sejalan dengan eksperimen elektronika.",
-                ),
-            ),
-            Rule(
-                name="Mesin-STEM",
-                major="Teknik Mesin",
-                weight=0.3,
-                condition=lambda f: (
-                    "Realistic" in f["interests"] and f["math"] >= 75 and f["physics"] >= 75,
-                    "Minat Realistic dan dasar Matematika/Fisika baik untuk mekanika.",
-                ),
-            ),
-            Rule(
-                name="Mesin-Industry",
-                major="Teknik Mesin",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] == "industri",
-                    "Preferensi industri cocok dengan manufaktur dan produksi.",
-                ),
-            ),
-            Rule(
-                name="Kedokteran-Bio",
-                major="Kedokteran",
-                weight=0.35,
-                condition=lambda f: (
-                    "Social" in f["interests"] and f["biology"] >= 85 and f["chemistry"] >= 80,
-                    "Minat Social serta nilai Biologi/Kimia tinggi diperlukan untuk profesi dokter.",
-                ),
-            ),
-            Rule(
-                name="Kedokteran-Career",
-                major="Kedokteran",
-                weight=0.2,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["dokter", "medis", "kesehatan"]),
-                    "Tujuan karier medis menguatkan pilihan Kedokteran.",
-                ),
-            ),
-            Rule(
-                name="Farmasi-Science",
-                major="Farmasi",
-                weight=0.3,
-                condition=lambda f: (
-                    "Investigative" in f["interests"] and f["chemistry"] >= 85,
-                    "Minat Investigative dan nilai Kimia tinggi sesuai eksperimen obat.",
-                ),
-            ),
-            Rule(
-                name="Farmasi-Bio",
-                major="Farmasi",
-                weight=0.2,
-                condition=lambda f: (
-                    f["biology"] >= 80,
-                    "Penguasaan Biologi mendukung pemahaman farmakologi.",
-                ),
-            ),
-            Rule(
-                name="Farmasi-Career",
-                major="Farmasi",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["farmasi", "apotek", "apoteker", "obat"]),
-                    "Tujuan karier di bidang farmasi memperkuat kecocokan.",
-                ),
-            ),
-            Rule(
-                name="Keperawatan-Social",
-                major="Keperawatan",
-                weight=0.3,
-                condition=lambda f: (
-                    "Social" in f["interests"] and f["biology"] >= 80,
-                    "Minat Social dan Biologi tinggi mendukung perawatan pasien.",
-                ),
-            ),
-            Rule(
-                name="Keperawatan-Career",
-                major="Keperawatan",
-                weight=0.2,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["perawat", "care", "nurse"]),
-                    "Tujuan karier keperawatan memperkuat pilihan.",
-                ),
-            ),
-            Rule(
-                name="Biologi-Riset",
-                major="Biologi",
-                weight=0.3,
-                condition=lambda f: (
-                    "Investigative" in f["interests"] and f["biology"] >= 85,
-                    "Minat Investigative dan nilai Biologi tinggi cocok untuk riset hayati.",
-                ),
-            ),
-            Rule(
-                name="Biologi-Environment",
-                major="Biologi",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] == "riset",
-                    "Preferensi riset mendukung kegiatan laboratorium Biologi.",
-                ),
-            ),
-            Rule(
-                name="Kimia-Riset",
-                major="Kimia",
-                weight=0.3,
-                condition=lambda f: (
-                    "Investigative" in f["interests"] and f["chemistry"] >= 85,
-                    "Minat Investigative dan Kimia tinggi diperlukan untuk riset kimia.",
-                ),
-            ),
-            Rule(
-                name="Kimia-Environment",
-                major="Kimia",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] == "riset",
-                    "Preferensi riset sesuai eksperimen laboratorium Kimia.",
-                ),
-            ),
-            Rule(
-                name="Kimia-Career",
-                major="Kimia",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["kimia", "chemist", "laboratorium"]),
-                    "Tujuan karier kimia memperkuat fokus eksperimen dan sintesis.",
-                ),
-            ),
-            Rule(
-                name="Hukum-Social",
-                major="Hukum",
-                weight=0.3,
-                condition=lambda f: (
-                    ("Enterprising" in f["interests"] or "Social" in f["interests"]) and f["language"] >= 80,
-                    "Minat Enterprising/Social serta Bahasa tinggi penting untuk advokasi hukum.",
-                ),
-            ),
-            Rule(
-                name="Hukum-Career",
-                major="Hukum",
-                weight=0.2,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["hukum", "law", "advokat", "jaksa"]),
-                    "Tujuan karier hukum memperkuat pilihan.",
-                ),
-            ),
-            Rule(
-                name="Psikologi-Social",
-                major="Psikologi",
-                weight=0.3,
-                condition=lambda f: (
-                    ("Social" in f["interests"] or "Artistic" in f["interests"]) and f["language"] >= 78,
-                    "Minat Social/Artistic dan Bahasa memadai untuk komunikasi psikologi.",
-                ),
-            ),
-            Rule(
-                name="Psikologi-Career",
-                major="Psikologi",
-                weight=0.2,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["psiko", "konselor", "terapis"]),
-                    "Tujuan karier konseling/terapi sesuai Psikologi.",
-                ),
-            ),
-            Rule(
-                name="Akuntansi-Conventional",
-                major="Akuntansi",
-                weight=0.3,
-                condition=lambda f: (
-                    "Conventional" in f["interests"] and f["math"] >= 78,
-                    "Minat Conventional dan Matematika tinggi mendukung pencatatan keuangan.",
-                ),
-            ),
-            Rule(
-                name="Akuntansi-Career",
-                major="Akuntansi",
-                weight=0.2,
-                condition=lambda f: (
-                    "akuntan" in f["career_goal"],
-                    "Tujuan karier akuntan memperkuat jurusan.",
-                ),
-            ),
-            Rule(
-                name="Manajemen-Enterprising",
-                major="Manajemen",
-                weight=0.25,
-                condition=lambda f: (
-                    "Enterprising" in f["interests"] and f["math"] >= 75,
-                    "Minat Enterprising dan dasar numerik baik untuk pengambilan keputusan bisnis.",
-                ),
-            ),
-            Rule(
-                name="Manajemen-Industry",
-                major="Manajemen",
-                weight=0.15,
-                condition=lambda f: (
-                    f["environment"] == "industri",
-                    "Preferensi industri sesuai praktik manajerial perusahaan.",
-                ),
-            ),
-            Rule(
-                name="Manajemen-Career",
-                major="Manajemen",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["manager", "bisnis", "entrepreneur"]),
-                    "Tujuan karier manajerial/bisnis mendukung jurusan.",
-                ),
-            ),
-            Rule(
-                name="Ekonomi-Analyst",
-                major="Ekonomi",
-                weight=0.25,
-                condition=lambda f: (
-                    ("Investigative" in f["interests"] or "Enterprising" in f["interests"]) and f["math"] >= 75,
-                    "Minat Investigative/Enterprising serta Matematika cukup untuk analisis ekonomi.",
-                ),
-            ),
-            Rule(
-                name="Ekonomi-Career",
-                major="Ekonomi",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["ekonomi", "analis", "riset pasar"]),
-                    "Tujuan karier analis ekonomi memperkuat jurusan.",
-                ),
-            ),
-            Rule(
-                name="Statistika-StrongMath",
-                major="Statistika",
-                weight=0.35,
-                condition=lambda f: (
-                    "Investigative" in f["interests"] and f["math"] >= 88,
-                    "Minat Investigative dan Matematika sangat tinggi kunci Statistika.",
-                ),
-            ),
-            Rule(
-                name="Statistika-Riset",
-                major="Statistika",
-                weight=0.2,
-                condition=lambda f: (
-                    f["environment"] == "riset",
-                    "Preferensi riset sesuai pengembangan model statistik.",
-                ),
-            ),
-            Rule(
-                name="Statistika-Career",
-                major="Statistika",
-                weight=0.15,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["statistik", "data", "analitik"]),
-                    "Tujuan karier analitik/data science mendukung Statistika.",
-                ),
-            ),
-            Rule(
-                name="DKV-Art",
-                major="Desain Komunikasi Visual",
-                weight=0.35,
-                condition=lambda f: (
-                    "Artistic" in f["interests"] and f["environment"] == "kreatif",
-                    "Minat Artistic dan lingkungan kreatif identik dengan DKV.",
-                ),
-            ),
-            Rule(
-                name="DKV-Career",
-                major="Desain Komunikasi Visual",
-                weight=0.2,
-                condition=lambda f: (
-                    any(k in f["career_goal"] for k in ["desain", "designer", "grafis"]),
-                    "Tujuan karier desain memperkuat jurusan DKV.",
-                ),
-            ),
-        ]
-
-    def _compute_total_weights(self) -> Dict[str, float]:
-        totals: Dict[str, float] = {}
-        for rule in self.rules:
-            totals[rule.major] = totals.get(rule.major, 0.0) + rule.weight
-        return totals
-
-
-@dataclass
-class FiredRule:
-    rule: Rule
-    explanation: str
-
-
-class InferenceEngine:
-    def __init__(self, kb: KnowledgeBase) -> None:
-        self.kb = kb
-
-    def infer(self, facts: Dict[str, object]) -> List[FiredRule]:
-        fired: List[FiredRule] = []
-        for rule in self.kb.rules:
-            result, explanation = rule.condition(facts)
-            if result:
-                fired.append(FiredRule(rule=rule, explanation=explanation))
-        return fired
-
-
-class Recommender:
-    def __init__(self, kb: KnowledgeBase, engine: InferenceEngine) -> None:
-        self.kb = kb
-        self.engine = engine
-
-    def recommend(self, facts: Dict[str, object], top_n: int = 3) -> List[Dict[str, object]]:
-        fired_rules = self.engine.infer(facts)
-        matched_weight: Dict[str, float] = {major: 0.0 for major in self.kb.total_weight_per_major}
-        contributing_rules: Dict[str, List[FiredRule]] = {major: [] for major in self.kb.total_weight_per_major}
-
-        for fired in fired_rules:
-            matched_weight[fired.rule.major] += fired.rule.weight
-            contributing_rules[fired.rule.major].append(fired)
-
-        recommendations: List[Dict[str, object]] = []
-        for major, total_weight in self.kb.total_weight_per_major.items():
-            if total_weight == 0:
-                continue
-            score = matched_weight[major] / total_weight
-            if matched_weight[major] == 0:
-                continue
-            recommendations.append(
-                {
-                    "major": major,
-                    "score": round(score, 3),
-                    "details": contributing_rules[major],
-                    "matched_weight": matched_weight[major],
-                    "total_weight": total_weight,
-                }
-            )
-
-        recommendations.sort(
-            key=lambda r: (r["score"], r["matched_weight"]),
-            reverse=True,
-        )
-        return recommendations[:top_n]
+__all__ = [
+    "CHECKPOINT_FORMAT",
+    "CHUNK_HEADER",
+    "CHUNK_MAGIC",
+    "CLI",
+    "GRADE_FIELDS",
+    "NO_MAJOR",
+    "PROFILE_LEAF_SIZE",
+    "RESULT_FORMAT",
+    "RESULT_MAGIC",
+    "RULE_FIELDS",
+    "SCORE_BINS",
+    "SNAPSHOT_FORMAT",
+    "SNAPSHOT_SUFFIXES",
+    "BatchInferenceEngine",
+    "BatchRow",
+    "Clause",
+    "ClauseStatistics",
+    "CohortStats",
+    "EvaluationPlan",
+    "FiredRule",
+    "IndexedInferenceEngine",
+    "InferenceEngine",
+    "KeywordIndex",
+    "KnowledgeBase",
+    "MultiTenantRecommender",
+    "Predicate",
+    "ProfileIndex",
+    "ProfiledInferenceEngine",
+    "RecommendationCache",
+    "RecommendationService",
+    "RecommendationSession",
+    "Recommender",
+    "ReloadingRecommender",
+    "ResultChunk",
+    "ResultReader",
+    "ResultWriter",
+    "Rule",
+    "RuleProfiler",
+    "ServiceBusy",
+    "SimilarProfile",
+    "StudentBatch",
+    "aggregate_cohort",
+    "build_recommender",
+    "clause_facts",
+    "compile_clause",
+    "default_knowledge_base",
+    "expand_intervals",
+    "facts_digest",
+    "facts_key",
+    "grade_cut_points",
+    "handle_payload",
+    "load_knowledge_base",
+    "load_rule_file",
+    "main",
+    "merge_cohorts",
+    "normalize_career_goal",
+    "normalize_grade",
+    "normalize_interests",
+    "normalize_option",
+    "parallel_recommend",
+    "plan_evaluation_order",
+    "read_records",
+    "recommend_stream",
+    "record_to_facts",
+    "rule_from_dict",
+    "rule_to_dict",
+    "run_batch",
+    "run_batch_columnar",
+    "run_batch_job",
+    "save_rule_file",
+    "sensitivity_sweep",
+    "serve",
+    "validate_records",
+    "validate_stream",
+]
 
 
 class CLI:
@@ -443,8 +154,8 @@ class CLI:
     VALID_STYLES = {"visual", "auditori", "kinestetik"}
     VALID_ENVIRONMENTS = {"riset", "industri", "kreatif"}
 
-    def __init__(self) -> None:
-        self.kb = KnowledgeBase()
+    def __init__(self, kb: Optional[KnowledgeBase] = None) -> None:
+        self.kb = kb or default_knowledge_base()
         self.engine = InferenceEngine(self.kb)
         self.recommender = Recommender(self.kb, self.engine)
 
@@ -454,7 +165,7 @@ class CLI:
         grades = self._ask_grades()
         learning_style = self._ask_option("Gaya belajar (visual/auditori/kinestetik)", self.VALID_STYLES)
         environment = self._ask_option("Preferensi lingkungan (riset/industri/kreatif)", self.VALID_ENVIRONMENTS)
-        career_goal = input("Tujuan karier (contoh: dokter, developer, analis data): ").strip().lower()
+        career_goal = normalize_career_goal(input("Tujuan karier (contoh: dokter, developer, analis data): "))
 
         facts = {
             "interests": interests,
@@ -476,10 +187,10 @@ class CLI:
             raw = input(
                 "Minat RIASEC (pisahkan dengan koma, contoh: Investigative,Realistic): "
             ).strip()
-            interests = {part.strip().capitalize() for part in raw.split(",") if part.strip()}
-            if interests and interests.issubset(self.VALID_INTERESTS):
-                return interests
-            print(f"Input tidak valid. Pilihan: {', '.join(sorted(self.VALID_INTERESTS))}.")
+            try:
+                return normalize_interests(raw)
+            except ValueError:
+                print(f"Input tidak valid. Pilihan: {', '.join(sorted(self.VALID_INTERESTS))}.")
 
     def _ask_grades(self) -> Dict[str, float]:
         return {
@@ -493,18 +204,18 @@ class CLI:
     def _ask_grade(self, prompt: str) -> float:
         while True:
             raw = input(f"{prompt} (0-100): ").strip()
-            if raw.isdigit():
-                value = int(raw)
-                if 0 <= value <= 100:
-                    return float(value)
-            print("Nilai harus berupa angka 0-100.")
+            try:
+                return normalize_grade(prompt, raw)
+            except ValueError:
+                print("Nilai harus berupa angka 0-100.")
 
     def _ask_option(self, prompt: str, valid_options: Set[str]) -> str:
         while True:
-            value = input(f"{prompt}: ").strip().lower()
-            if value in valid_options:
-                return value
-            print(f"Pilihan tidak valid. Gunakan salah satu: {', '.join(sorted(valid_options))}.")
+            raw = input(f"{prompt}: ")
+            try:
+                return normalize_option(prompt, raw, valid_options)
+            except ValueError:
+                print(f"Pilihan tidak valid. Gunakan salah satu: {', '.join(sorted(valid_options))}.")
 
     def _display_results(self, recommendations: List[Dict[str, object]]) -> None:
         if not recommendations:
@@ -515,80 +226,1537 @@ class CLI:
         for idx, rec in enumerate(recommendations, start=1):
             print(f"{idx}. {rec['major']} (skor: {rec['score']})")
             print("   Alasan:")
-            for fired in rec["details"]:
+            for fired in self.recommender.explain(rec):
                 print(f"   - Rule {fired.rule.name} (CF {fired.rule.weight}): {fired.explanation}")
             print()
 
 
-def build_recommender() -> Recommender:
-    kb = KnowledgeBase()
-    engine = InferenceEngine(kb)
-    return Recommender(kb, engine)
+def normalize_interests(raw: object) -> Set[str]:
+    parts = (raw or "").split(",") if isinstance(raw, str) or raw is None else raw
+    try:
+        interests = {str(part).strip().capitalize() for part in parts if str(part).strip()}
+    except TypeError:
+        raise ValueError(f"Minat tidak valid: {raw!r}") from None
+    if not interests or not interests.issubset(CLI.VALID_INTERESTS):
+        raise ValueError(f"Minat tidak valid: {raw!r}")
+    return interests
 
 
-class RecommendationTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.recommender = build_recommender()
+def normalize_grade(field: str, raw: object) -> float:
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"Nilai {field} tidak valid: {raw!r}") from None
+    if not 0 <= value <= 100:
+        raise ValueError(f"Nilai {field} harus 0-100: {value}")
+    return value
 
-    def test_stem_strength(self) -> None:
-        facts = {
-            "interests": {"Investigative", "Realistic"},
-            "math": 95,
-            "physics": 92,
-            "biology": 80,
-            "chemistry": 90,
-            "language": 78,
-            "learning_style": "visual",
-            "environment": "riset",
-            "career_goal": "insinyur robotik",
-        }
-        recs = self.recommender.recommend(facts)
-        majors = [r["major"] for r in recs]
-        self.assertIn("Teknik Elektro", majors)
-        self.assertIn("Teknik Informatika", majors)
-        self.assertIn("Statistika", majors)
-        self.assertEqual(recs[0]["major"], "Teknik Elektro")
-
-    def test_medical_strength(self) -> None:
-        facts = {
-            "interests": {"Social", "Investigative"},
-            "math": 75,
-            "physics": 70,
-            "biology": 95,
-            "chemistry": 92,
-            "language": 80,
-            "learning_style": "auditori",
-            "environment": "riset",
-            "career_goal": "dokter spesialis",
+
+def normalize_option(field: str, raw: object, valid_options: Set[str]) -> str:
+    value = str(raw or "").strip().lower()
+    if value not in valid_options:
+        raise ValueError(f"Pilihan {field} tidak valid: {raw!r}")
+    return value
+
+
+def normalize_career_goal(raw: object) -> str:
+    return str(raw or "").strip().lower()
+
+
+def record_to_facts(record: Dict[str, object]) -> Dict[str, object]:
+    facts: Dict[str, object] = {"interests": normalize_interests(record.get("interests"))}
+    for field in GRADE_FIELDS:
+        facts[field] = normalize_grade(field, record.get(field))
+    facts["learning_style"] = normalize_option("learning_style", record.get("learning_style"), CLI.VALID_STYLES)
+    facts["environment"] = normalize_option("environment", record.get("environment"), CLI.VALID_ENVIRONMENTS)
+    facts["career_goal"] = normalize_career_goal(record.get("career_goal"))
+    return facts
+
+
+BatchRow = Tuple[object, Optional[Dict[str, object]], str]
+
+
+def _validate_record(position: int, record: object) -> BatchRow:
+    if not isinstance(record, dict):
+        return position, None, "Data siswa harus berupa objek."
+    student_id = record.get("id") or position
+    try:
+        return student_id, record_to_facts(record), ""
+    except ValueError as exc:
+        return student_id, None, str(exc)
+
+
+def validate_records(
+    records: Iterable[object], start: int = 1
+) -> Tuple[List[Tuple[object, Dict[str, object]]], List[Tuple[object, object, str]]]:
+    valid: List[Tuple[object, Dict[str, object]]] = []
+    errors: List[Tuple[object, object, str]] = []
+    for position, record in enumerate(records, start=start):
+        student_id, facts, error = _validate_record(position, record)
+        if facts is None:
+            errors.append((student_id, record, error))
+        else:
+            valid.append((student_id, facts))
+    return valid, errors
+
+
+async def _record_batches(
+    records: Union[Iterable[object], AsyncIterable[object]], size: int
+) -> AsyncIterator[List[object]]:
+    if not hasattr(records, "__aiter__"):
+        for batch in _chunked(records, size):
+            yield batch
+        return
+    batch: List[object] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def validate_stream(
+    records: Union[Iterable[object], AsyncIterable[object]],
+    error_sink: Optional[Callable[[object, object, str], object]] = None,
+    batch_size: int = 1024,
+    max_pending: int = 4,
+) -> AsyncIterator[List[Tuple[object, Dict[str, object]]]]:
+    queue: "asyncio.Queue[Optional[List[Tuple[object, Dict[str, object]]]]]" = asyncio.Queue(max_pending)
+    failures: List[Exception] = []
+
+    async def validate(batch: List[object], start: int) -> None:
+        valid, errors = validate_records(batch, start)
+        if error_sink is not None:
+            for student_id, record, error in errors:
+                outcome = error_sink(student_id, record, error)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+        if valid:
+            await queue.put(valid)
+
+    async def produce() -> None:
+        position = 1
+        try:
+            async for batch in _record_batches(records, batch_size):
+                await validate(batch, position)
+                position += len(batch)
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            failures.append(exc)
+        await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            valid = await queue.get()
+            if valid is None:
+                break
+            yield valid
+        if failures:
+            raise failures[0]
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+
+async def recommend_stream(
+    recommender: Recommender,
+    records: Union[Iterable[object], AsyncIterable[object]],
+    error_sink: Optional[Callable[[object, object, str], object]] = None,
+    top_n: int = 3,
+    batch_size: int = 1024,
+) -> AsyncIterator[Tuple[object, List[Dict[str, object]]]]:
+    async for batch in validate_stream(records, error_sink, batch_size):
+        ranked = recommender.recommend_batch([facts for _, facts in batch], top_n=top_n, explain=False)
+        for (student_id, _), recommendations in zip(batch, ranked):
+            yield student_id, recommendations
+        await asyncio.sleep(0)
+
+
+def _parse_records(stream: TextIO, fmt: str) -> Iterator[Tuple[object, str]]:
+    if fmt == "csv":
+        for record in csv.DictReader(stream):
+            yield record, ""
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line), ""
+                except ValueError as exc:
+                    yield None, f"JSON tidak valid: {exc}"
+    else:
+        raise ValueError(f"Format tidak dikenal: {fmt}")
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict[str, object]]:
+    for record, error in _parse_records(stream, fmt):
+        if error:
+            raise ValueError(error)
+        yield record
+
+
+RULE_FIELDS = ("name", "major", "weight", "explanation", "interests", "min_grades", "environments", "career_keywords")
+
+
+def rule_to_dict(rule: Rule) -> Dict[str, object]:
+    data: Dict[str, object] = {
+        "name": rule.name,
+        "major": rule.major,
+        "weight": rule.weight,
+        "explanation": rule.explanation,
+    }
+    if rule.interests:
+        data["interests"] = sorted(rule.interests)
+    if rule.min_grades:
+        data["min_grades"] = dict(rule.min_grades)
+    if rule.environments:
+        data["environments"] = sorted(rule.environments)
+    if rule.career_keywords:
+        data["career_keywords"] = list(rule.career_keywords)
+    return data
+
+
+def _string_list(data: Dict[str, object], field: str, label: str) -> List[str]:
+    values = data.get(field, [])
+    if isinstance(values, str) or not isinstance(values, list):
+        raise ValueError(f"Rule {label}: '{field}' harus berupa list.")
+    if not all(isinstance(value, str) and value for value in values):
+        raise ValueError(f"Rule {label}: isi '{field}' harus berupa teks tidak kosong.")
+    return values
+
+
+def rule_from_dict(data: object) -> Rule:
+    if not isinstance(data, dict):
+        raise ValueError("Setiap rule harus berupa objek.")
+    label = repr(data.get("name", "?"))
+    unknown = sorted(set(data) - set(RULE_FIELDS))
+    if unknown:
+        raise ValueError(f"Rule {label}: field tidak dikenal {', '.join(unknown)}.")
+    for field in ("name", "major", "explanation"):
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            raise ValueError(f"Rule {label}: '{field}' wajib diisi.")
+    weight = data.get("weight")
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight) or weight < 0:
+        raise ValueError(f"Rule {label}: 'weight' harus berupa angka >= 0.")
+
+    interests = _string_list(data, "interests", label)
+    if not set(interests) <= CLI.VALID_INTERESTS:
+        raise ValueError(f"Rule {label}: minat tidak dikenal {sorted(set(interests) - CLI.VALID_INTERESTS)}.")
+    environments = _string_list(data, "environments", label)
+    if not set(environments) <= CLI.VALID_ENVIRONMENTS:
+        raise ValueError(
+            f"Rule {label}: lingkungan tidak dikenal {sorted(set(environments) - CLI.VALID_ENVIRONMENTS)}."
+        )
+    min_grades = data.get("min_grades", {})
+    if not isinstance(min_grades, dict):
+        raise ValueError(f"Rule {label}: 'min_grades' harus berupa objek.")
+    for subject, threshold in min_grades.items():
+        if subject not in GRADE_FIELDS:
+            raise ValueError(f"Rule {label}: mata pelajaran tidak dikenal {subject!r}.")
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 <= threshold <= 100:
+            raise ValueError(f"Rule {label}: nilai minimum {subject} harus 0-100.")
+
+    return Rule(
+        name=data["name"],
+        major=data["major"],
+        weight=weight,
+        explanation=data["explanation"],
+        interests=interests,
+        min_grades=dict(min_grades),
+        environments=environments,
+        career_keywords=_string_list(data, "career_keywords", label),
+    )
+
+
+def load_rule_file(path: str) -> List[Rule]:
+    with open(path, encoding="utf-8") as handle:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML belum terpasang; gunakan file rule JSON.") from None
+            try:
+                document = yaml.safe_load(handle)
+            except yaml.YAMLError as exc:
+                raise ValueError(f"File rule {path} bukan YAML yang valid: {exc}") from None
+        else:
+            document = json.load(handle)
+    entries = document.get("rules") if isinstance(document, dict) else document
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"File rule {path} harus berisi daftar 'rules' yang tidak kosong.")
+    rules = [rule_from_dict(entry) for entry in entries]
+    names = [rule.name for rule in rules]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Nama rule ganda: {', '.join(duplicates)}.")
+    return rules
+
+
+def save_rule_file(rules: Iterable[Rule], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"rules": [rule_to_dict(rule) for rule in rules]}, handle, ensure_ascii=False, indent=2)
+        handle.write("\n")
+
+
+def load_knowledge_base(path: str) -> KnowledgeBase:
+    if path.lower().endswith(SNAPSHOT_SUFFIXES):
+        return KnowledgeBase.from_snapshot(path)
+    return KnowledgeBase(load_rule_file(path))
+
+
+class ReloadingRecommender:
+    def __init__(self, path: str, cache_size: int = 0) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self._mtime = os.stat(path).st_mtime_ns
+        self.current = self._build(load_knowledge_base(path))
+
+    def _build(self, kb: KnowledgeBase) -> Recommender:
+        cache = RecommendationCache(self.cache_size) if self.cache_size else None
+        return Recommender(kb, InferenceEngine(kb), cache)
+
+    def maybe_reload(self) -> bool:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return False
+        recommender = self._build(load_knowledge_base(self.path))
+        self._mtime = mtime
+        self.current = recommender
+        return True
+
+    @property
+    def kb(self) -> KnowledgeBase:
+        return self.current.kb
+
+    def recommend(
+        self, facts: Dict[str, object], top_n: int = 3, explain: bool = True
+    ) -> List[Dict[str, object]]:
+        return self.current.recommend(facts, top_n, explain)
+
+    def recommend_batch(
+        self, facts_list: Sequence[Dict[str, object]], top_n: int = 3, explain: bool = True
+    ) -> List[List[Dict[str, object]]]:
+        return self.current.recommend_batch(facts_list, top_n, explain)
+
+
+def grade_cut_points(kb: KnowledgeBase, subject: str, low: float = 0, high: float = 100) -> List[float]:
+    cuts = {clause[2] for clause in kb.clauses if clause[0] == "grade" and clause[1] == subject}
+    return [low] + sorted(cut for cut in cuts if low < cut <= high)
+
+
+def sensitivity_sweep(
+    recommender: Recommender,
+    base_facts: Dict[str, object],
+    subjects: Sequence[str] = GRADE_FIELDS,
+    interest_sets: Optional[Iterable[Iterable[str]]] = None,
+    environments: Optional[Iterable[str]] = None,
+    top_n: int = 3,
+    low: float = 0,
+    high: float = 100,
+) -> Iterator[Dict[str, object]]:
+    kb = recommender.kb
+    engine = recommender.engine
+    if interest_sets is None:
+        names = sorted(CLI.VALID_INTERESTS)
+        interest_sets = (combo for size in range(1, len(names) + 1) for combo in itertools.combinations(names, size))
+    interest_sets = [frozenset(interests) for interests in interest_sets]
+    environments = sorted(CLI.VALID_ENVIRONMENTS) if environments is None else list(environments)
+    cut_points = {subject: grade_cut_points(kb, subject, low, high) for subject in subjects}
+
+    for interests in interest_sets:
+        for environment in environments:
+            facts = kb.derive_facts({**base_facts, "interests": interests, "environment": environment})
+            base_fired = engine.infer_compact(facts)
+            for subject in subjects:
+                dependent = kb.rules_by_fact.get(subject, 0)
+                unaffected = base_fired & ~dependent
+                cuts = cut_points[subject]
+                intervals: List[Dict[str, object]] = []
+                for position, start in enumerate(cuts):
+                    end = cuts[position + 1] if position + 1 < len(cuts) else high
+                    fired = unaffected | engine.infer_subset({**facts, subject: start}, dependent)
+                    ranked = [(r["major"], r["score"]) for r in recommender.rank(fired, top_n, explain=False)]
+                    if intervals and intervals[-1]["recommendations"] == ranked:
+                        intervals[-1]["to"] = end
+                    else:
+                        intervals.append({"from": start, "to": end, "recommendations": ranked})
+                yield {
+                    "subject": subject,
+                    "interests": sorted(interests),
+                    "environment": environment,
+                    "intervals": intervals,
+                }
+
+
+def expand_intervals(
+    intervals: List[Dict[str, object]], grades: Iterable[float] = range(0, 101)
+) -> List[List[Tuple[str, float]]]:
+    expanded: List[List[Tuple[str, float]]] = []
+    starts = [interval["from"] for interval in intervals]
+    for grade in grades:
+        position = bisect_right(starts, grade) - 1
+        expanded.append(intervals[max(position, 0)]["recommendations"])
+    return expanded
+
+
+
+def _chunked(items: Iterable[object], size: int) -> Iterator[List[object]]:
+    chunk: List[object] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _format_rows(recommender: Recommender, rows: List[BatchRow], top_n: int) -> List[str]:
+    valid = [facts for _, facts, _ in rows if facts is not None]
+    ranked = iter(recommender.recommend_batch(valid, top_n=top_n, explain=False))
+    lines: List[str] = []
+    for student_id, facts, error in rows:
+        if facts is None:
+            result: Dict[str, object] = {"id": student_id, "error": error}
+        else:
+            result = {
+                "id": student_id,
+                "recommendations": [{"major": r["major"], "score": r["score"]} for r in next(ranked)],
+            }
+        lines.append(json.dumps(result, ensure_ascii=False) + "\n")
+    return lines
+
+
+_worker_recommender: Optional[Recommender] = None
+
+
+def _init_worker(rules: List[Rule]) -> None:
+    global _worker_recommender
+    kb = KnowledgeBase(rules)
+    _worker_recommender = Recommender(kb, InferenceEngine(kb))
+
+
+def _worker_format_rows(task: Tuple[List[BatchRow], int]) -> List[str]:
+    rows, top_n = task
+    return _format_rows(_worker_recommender, rows, top_n)
+
+
+def _worker_recommend(task: Tuple[List[Dict[str, object]], int]) -> List[List[Dict[str, object]]]:
+    facts_list, top_n = task
+    return _worker_recommender.recommend_batch(facts_list, top_n=top_n, explain=False)
+
+
+def _ordered_pool_map(
+    func: Callable[[object], object], tasks: Iterable[object], rules: List[Rule], workers: Optional[int]
+) -> Iterator[object]:
+    workers = workers or os.cpu_count() or 1
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(rules,)) as pool:
+        in_flight: Deque["multiprocessing.pool.AsyncResult"] = deque()
+        for task in tasks:
+            in_flight.append(pool.apply_async(func, (task,)))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
+
+
+def parallel_recommend(
+    facts_stream: Iterable[Dict[str, object]],
+    rules: Optional[List[Rule]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 1024,
+    top_n: int = 3,
+) -> Iterator[List[Dict[str, object]]]:
+    rules = KnowledgeBase().rules if rules is None else list(rules)
+    tasks = ((chunk, top_n) for chunk in _chunked(facts_stream, chunk_size))
+    for ranked in _ordered_pool_map(_worker_recommend, tasks, rules, workers):
+        yield from ranked
+
+
+def _batch_rows(input_stream: TextIO, fmt: str, counts: Dict[str, int]) -> Iterator[BatchRow]:
+    for line_no, (record, error) in enumerate(_parse_records(input_stream, fmt), start=1):
+        row = (line_no, None, error) if error else _validate_record(line_no, record)
+        counts["failed" if row[1] is None else "processed"] += 1
+        yield row
+
+
+def run_batch(
+    recommender: Recommender,
+    input_stream: TextIO,
+    output_stream: TextIO,
+    fmt: str,
+    top_n: int = 3,
+    chunk_size: int = 1024,
+    workers: int = 1,
+) -> Tuple[int, int]:
+    counts = {"processed": 0, "failed": 0}
+    chunks = _chunked(_batch_rows(input_stream, fmt, counts), chunk_size)
+    if workers > 1:
+        tasks = ((chunk, top_n) for chunk in chunks)
+        results = _ordered_pool_map(_worker_format_rows, tasks, recommender.kb.rules, workers)
+    else:
+        results = (_format_rows(recommender, chunk, top_n) for chunk in chunks)
+    for lines in results:
+        output_stream.writelines(lines)
+    return counts["processed"], counts["failed"]
+
+
+CHECKPOINT_FORMAT = "expert-system-job/1"
+
+
+def facts_digest(facts: Dict[str, object]) -> str:
+    normalized = {
+        name: sorted(value) if isinstance(value, (set, frozenset)) else value for name, value in facts.items()
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _raw_records(
+    source: BinaryIO, fmt: str, header: Optional[List[str]]
+) -> Iterator[Tuple[Optional[Dict[str, object]], str, int]]:
+    if source.tell() == 0 and source.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+        source.seek(0)
+    pending = b""
+    for line in iter(source.readline, b""):
+        pending += line
+        if fmt == "csv" and pending.count(b'"') % 2:
+            continue
+        data, pending = pending, b""
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            yield None, f"Baris bukan UTF-8 yang valid: {exc}", source.tell()
+            continue
+        if not text.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader(io.StringIO(text)))
+            yield dict(zip(header or [], values)), "", source.tell()
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            yield None, f"JSON tidak valid: {exc}", source.tell()
+        else:
+            yield record, "", source.tell()
+    if pending.strip():
+        yield None, "Baris terakhir tidak lengkap.", source.tell()
+
+
+def _read_checkpoint(path: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            state = json.load(handle)
+    except FileNotFoundError:
+        return None
+    if state.get("format") != CHECKPOINT_FORMAT:
+        raise ValueError(f"Checkpoint {path} tidak dikenali.")
+    return state
+
+
+def _write_checkpoint(path: str, state: Dict[str, object]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(state, handle, ensure_ascii=False)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def _input_stamp(path: str) -> Dict[str, int]:
+    info = os.stat(path)
+    return {"size": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+def _previous_rows(
+    previous: Optional[str], fingerprint: str, fmt: str, top_n: int, offset: int
+) -> Iterator[Tuple[object, str, bytes, int]]:
+    if previous is None:
+        return
+    state = _read_checkpoint(f"{previous}.ckpt")
+    if (
+        state is None
+        or not state.get("complete")
+        or state.get("kb_fingerprint") != fingerprint
+        or state.get("format_name") != fmt
+        or state.get("top_n") != top_n
+    ):
+        return
+    with open(previous, "rb") as handle:
+        handle.seek(offset)
+        for line in iter(handle.readline, b""):
+            row = json.loads(line)
+            yield row.get("id"), row.get("facts_hash", ""), line, handle.tell()
+
+
+def run_batch_job(
+    recommender: Recommender,
+    input_path: str,
+    output_path: str,
+    fmt: str,
+    top_n: int = 3,
+    chunk_size: int = 1024,
+    previous: Optional[str] = None,
+) -> Tuple[int, int, int]:
+    checkpoint_path = f"{output_path}.ckpt"
+    fingerprint = recommender.kb.fingerprint()
+    stamp = _input_stamp(input_path)
+    state = _read_checkpoint(checkpoint_path)
+    if state is not None and (
+        state["input"] != os.path.abspath(input_path)
+        or state["kb_fingerprint"] != fingerprint
+        or state["format_name"] != fmt
+        or state["top_n"] != top_n
+        or state["previous"] != (os.path.abspath(previous) if previous else None)
+    ):
+        raise ValueError(f"Checkpoint {checkpoint_path} milik job lain; hapus file tersebut untuk mulai ulang.")
+    if state is not None and state.get("input_stamp") != stamp:
+        raise ValueError(
+            f"Input {input_path} berubah sejak checkpoint dibuat; hapus {checkpoint_path} untuk mulai ulang."
+        )
+    if state is None:
+        state = {
+            "format": CHECKPOINT_FORMAT,
+            "input": os.path.abspath(input_path),
+            "input_stamp": stamp,
+            "format_name": fmt,
+            "top_n": top_n,
+            "kb_fingerprint": fingerprint,
+            "header": None,
+            "previous": os.path.abspath(previous) if previous else None,
+            "previous_offset": 0,
+            "input_offset": 0,
+            "output_offset": 0,
+            "rows": 0,
+            "processed": 0,
+            "failed": 0,
+            "reused": 0,
+            "complete": False,
         }
-        recs = self.recommender.recommend(facts)
-        self.assertGreater(len(recs), 0)
-        self.assertEqual(recs[0]["major"], "Kedokteran")
+    if state["complete"]:
+        return state["processed"], state["failed"], state["reused"]
+    previous_rows = _previous_rows(previous, fingerprint, fmt, top_n, state["previous_offset"])
+    with (
+        contextlib.closing(previous_rows),
+        open(input_path, "rb") as source,
+        open(output_path, "r+b" if state["output_offset"] else "wb") as sink,
+    ):
+        if fmt == "csv" and state["header"] is None:
+            state["header"] = next(csv.reader([source.readline().decode("utf-8-sig")]), [])
+            state["input_offset"] = source.tell()
+        source.seek(state["input_offset"])
+        sink.seek(state["output_offset"])
+        sink.truncate()
+        for chunk in _chunked(_raw_records(source, fmt, state["header"]), chunk_size):
+            rows: List[Tuple[object, Optional[Dict[str, object]], str, str]] = []
+            for record, error, _ in chunk:
+                state["rows"] += 1
+                if error:
+                    rows.append((state["rows"], None, "", error))
+                    continue
+                student_id, facts, error = _validate_record(state["rows"], record)
+                rows.append((student_id, facts, facts_digest(facts) if facts is not None else "", error))
 
-    def test_art_design_strength(self) -> None:
-        facts = {
-            "interests": {"Artistic", "Enterprising"},
-            "math": 70,
-            "physics": 60,
-            "biology": 65,
-            "chemistry": 60,
-            "language": 85,
-            "learning_style": "visual",
-            "environment": "kreatif",
-            "career_goal": "desainer grafis",
+            reused: List[Optional[bytes]] = []
+            for student_id, facts, digest, _ in rows:
+                match = next(previous_rows, None)
+                if match is None:
+                    reused.append(None)
+                    continue
+                state["previous_offset"] = match[3]
+                same = facts is not None and match[0] == student_id and match[1] == digest
+                reused.append(match[2] if same else None)
+
+            fresh = [facts for (_, facts, _, _), line in zip(rows, reused) if facts is not None and line is None]
+            ranked = iter(recommender.recommend_batch(fresh, top_n, explain=False))
+            lines: List[bytes] = []
+            for (student_id, facts, digest, error), line in zip(rows, reused):
+                if facts is None:
+                    state["failed"] += 1
+                    result: Dict[str, object] = {"id": student_id, "error": error}
+                    lines.append((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                    continue
+                state["processed"] += 1
+                if line is not None:
+                    state["reused"] += 1
+                    lines.append(line)
+                    continue
+                result = {
+                    "id": student_id,
+                    "recommendations": [{"major": r["major"], "score": r["score"]} for r in next(ranked)],
+                    "facts_hash": digest,
+                }
+                lines.append((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+
+            sink.writelines(lines)
+            sink.flush()
+            os.fsync(sink.fileno())
+            state["input_offset"] = chunk[-1][2]
+            state["output_offset"] = sink.tell()
+            _write_checkpoint(checkpoint_path, state)
+
+    state["complete"] = True
+    _write_checkpoint(checkpoint_path, state)
+    return state["processed"], state["failed"], state["reused"]
+
+
+RESULT_MAGIC = b"ESRS"
+RESULT_FORMAT = 1
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIBI")
+NO_MAJOR = 0xFFFF
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _chunk_index(data: bytes, offset: int) -> Tuple[List[Tuple[int, int, bool, int]], int]:
+    chunks: List[Tuple[int, int, bool, int]] = []
+    while offset + CHUNK_HEADER.size <= len(data):
+        magic, rows, compressed, length = CHUNK_HEADER.unpack_from(data, offset)
+        if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + length > len(data):
+            break
+        chunks.append((offset + CHUNK_HEADER.size, rows, bool(compressed), length))
+        offset += CHUNK_HEADER.size + length
+    return chunks, offset
+
+
+def _column(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+class ResultWriter:
+    def __init__(
+        self,
+        path: str,
+        kb: KnowledgeBase,
+        top_n: int = 3,
+        chunk_rows: int = 4096,
+        compress: bool = True,
+    ) -> None:
+        self.path = path
+        self.top_n = top_n
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.majors = list(kb.total_weight_per_major)
+        self.rule_names = [rule.name for rule in kb.rules]
+        self.bitmap_bytes = (len(self.rule_names) + 7) // 8
+        self._major_codes = {major: code for code, major in enumerate(self.majors)}
+        self._reset_chunk()
+        self.rows_written = 0
+        metadata = {"top_n": top_n, "majors": self.majors, "rules": self.rule_names}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing = ResultReader.read_metadata(path)
+            if existing != metadata:
+                raise ValueError(f"File hasil {path} dibuat dengan knowledge base atau top_n berbeda.")
+            self._handle = open(path, "r+b")
+            with mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _, header_end = ResultReader._parse_header(data)
+                _, end = _chunk_index(data, header_end)
+            self._handle.truncate(end)
+            self._handle.seek(end)
+        else:
+            self._handle = open(path, "wb")
+            encoded = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+            self._handle.write(RESULT_MAGIC + struct.pack("<HI", RESULT_FORMAT, len(encoded)) + encoded)
+
+    def _reset_chunk(self) -> None:
+        self._ids: List[bytes] = []
+        self._majors = array("H")
+        self._scores = array("H")
+        self._bitmaps = bytearray()
+
+    def append(self, student_id: object, recommendations: List[Dict[str, object]], fired: int) -> None:
+        self._ids.append(str(student_id).encode("utf-8"))
+        for position in range(self.top_n):
+            if position < len(recommendations):
+                recommendation = recommendations[position]
+                self._majors.append(self._major_codes[recommendation["major"]])
+                self._scores.append(int(round(recommendation["score"] * 1000)))
+            else:
+                self._majors.append(NO_MAJOR)
+                self._scores.append(0)
+        self._bitmaps += fired.to_bytes(self.bitmap_bytes, "little")
+        if len(self._ids) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        rows = len(self._ids)
+        if not rows:
+            return
+        offsets = array("I", [0])
+        for encoded in self._ids:
+            offsets.append(offsets[-1] + len(encoded))
+        sections = [
+            _little_endian(offsets),
+            b"".join(self._ids),
+            _little_endian(self._majors),
+            _little_endian(self._scores),
+            bytes(self._bitmaps),
+        ]
+        payload = b"".join(struct.pack("<I", len(section)) + section for section in sections)
+        if self.compress:
+            payload = zlib.compress(payload)
+        self._handle.write(CHUNK_HEADER.pack(CHUNK_MAGIC, rows, int(self.compress), len(payload)) + payload)
+        self._handle.flush()
+        self.rows_written += rows
+        self._reset_chunk()
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self.flush()
+            self._handle.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+@dataclass
+class ResultChunk:
+    ids: List[str]
+    majors: array
+    scores: array
+    bitmaps: bytes
+
+
+class ResultReader:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._handle = open(path, "rb")
+        self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        metadata, offset = self._parse_header(self._map)
+        self.top_n: int = metadata["top_n"]
+        self.majors: List[str] = metadata["majors"]
+        self.rule_names: List[str] = metadata["rules"]
+        self.bitmap_bytes = (len(self.rule_names) + 7) // 8
+        self._chunks, _ = _chunk_index(self._map, offset)
+
+    @staticmethod
+    def _parse_header(data: bytes) -> Tuple[Dict[str, object], int]:
+        if data[:4] != RESULT_MAGIC:
+            raise ValueError("Bukan file hasil kolumnar.")
+        version, length = struct.unpack_from("<HI", data, 4)
+        if version != RESULT_FORMAT:
+            raise ValueError(f"Versi file hasil tidak didukung: {version}")
+        start = 4 + struct.calcsize("<HI")
+        return json.loads(bytes(data[start : start + length])), start + length
+
+    @classmethod
+    def read_metadata(cls, path: str) -> Dict[str, object]:
+        with open(path, "rb") as handle:
+            head = handle.read(10)
+            length = struct.unpack_from("<I", head, 6)[0] if len(head) == 10 else 0
+            return cls._parse_header(head + handle.read(length))[0]
+
+    def __len__(self) -> int:
+        return sum(rows for _, rows, _, _ in self._chunks)
+
+    def chunks(self) -> Iterator[ResultChunk]:
+        for start, rows, compressed, length in self._chunks:
+            payload = self._map[start : start + length]
+            if compressed:
+                payload = zlib.decompress(payload)
+            sections: List[bytes] = []
+            position = 0
+            while position < len(payload):
+                (size,) = struct.unpack_from("<I", payload, position)
+                sections.append(payload[position + 4 : position + 4 + size])
+                position += 4 + size
+            offsets = _column("I", sections[0])
+            blob = sections[1]
+            yield ResultChunk(
+                ids=[blob[offsets[j] : offsets[j + 1]].decode("utf-8") for j in range(rows)],
+                majors=_column("H", sections[2]),
+                scores=_column("H", sections[3]),
+                bitmaps=sections[4],
+            )
+
+    def __iter__(self) -> Iterator[Tuple[str, List[Tuple[str, float]], int]]:
+        top_n, width = self.top_n, self.bitmap_bytes
+        for chunk in self.chunks():
+            for j, student_id in enumerate(chunk.ids):
+                ranked = [
+                    (self.majors[chunk.majors[k]], chunk.scores[k] / 1000)
+                    for k in range(j * top_n, (j + 1) * top_n)
+                    if chunk.majors[k] != NO_MAJOR
+                ]
+                fired = int.from_bytes(chunk.bitmaps[j * width : (j + 1) * width], "little")
+                yield student_id, ranked, fired
+
+    def top_major_counts(self) -> Dict[str, int]:
+        counts = [0] * len(self.majors)
+        for chunk in self.chunks():
+            top = chunk.majors[:: self.top_n]
+            for code in set(top):
+                if code != NO_MAJOR:
+                    counts[code] += top.count(code)
+        return {major: count for major, count in zip(self.majors, counts) if count}
+
+    def count_top_major(self, major: str) -> int:
+        return self.top_major_counts().get(major, 0)
+
+    def close(self) -> None:
+        self._map.close()
+        self._handle.close()
+
+    def __enter__(self) -> "ResultReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def run_batch_columnar(
+    recommender: Recommender,
+    input_stream: TextIO,
+    output_path: str,
+    fmt: str,
+    top_n: int = 3,
+    chunk_size: int = 1024,
+    compress: bool = True,
+    error_sink: Optional[Callable[[object, str], object]] = None,
+) -> Tuple[int, int]:
+    counts = {"processed": 0, "failed": 0}
+    with ResultWriter(output_path, recommender.kb, top_n, chunk_rows=chunk_size * 4, compress=compress) as writer:
+        for rows in _chunked(_batch_rows(input_stream, fmt, counts), chunk_size):
+            if error_sink is not None:
+                for student_id, facts, error in rows:
+                    if facts is None:
+                        error_sink(student_id, error)
+            valid = [(student_id, facts) for student_id, facts, _ in rows if facts is not None]
+            fired_masks = recommender.infer_batch([facts for _, facts in valid])
+            for (student_id, _), fired in zip(valid, fired_masks):
+                writer.append(student_id, recommender.rank(fired, top_n, explain=False), fired)
+    return counts["processed"], counts["failed"]
+
+
+SCORE_BINS = 1001
+
+
+class CohortStats:
+    def __init__(self, kb: KnowledgeBase) -> None:
+        self.kb = kb
+        self.rule_names: Tuple[str, ...] = tuple(rule.name for rule in kb.rules)
+        self.students = 0
+        self.top_majors: Dict[str, int] = {}
+        self.major_counts: Dict[str, int] = {}
+        self.score_sums: Dict[str, int] = {}
+        self.histograms: Dict[str, array] = {}
+        self.rule_fires = array("Q", bytes(8 * len(self.rule_names)))
+
+    def add(self, recommendations: List[Dict[str, object]], fired: int) -> None:
+        self.add_ranked([(r["major"], r["score"]) for r in recommendations], fired)
+
+    def add_ranked(self, ranked: List[Tuple[str, float]], fired: int) -> None:
+        self.students += 1
+        if ranked:
+            top = ranked[0][0]
+            self.top_majors[top] = self.top_majors.get(top, 0) + 1
+        totals = self.kb.total_weight_per_major
+        for major, weight in self.kb.matched_weights(fired).items():
+            if weight == 0 or totals[major] == 0:
+                continue
+            histogram = self.histograms.get(major)
+            if histogram is None:
+                histogram = self.histograms[major] = array("Q", bytes(8 * SCORE_BINS))
+            millis = int(round(weight / totals[major] * 1000))
+            histogram[min(SCORE_BINS - 1, max(0, millis))] += 1
+            self.major_counts[major] = self.major_counts.get(major, 0) + 1
+            self.score_sums[major] = self.score_sums.get(major, 0) + millis
+        rule_fires = self.rule_fires
+        for i in _set_bits(fired):
+            rule_fires[i] += 1
+
+    def merge(self, other: "CohortStats") -> "CohortStats":
+        if other.rule_names != self.rule_names:
+            raise ValueError("Agregat berasal dari knowledge base yang berbeda.")
+        self.students += other.students
+        for major, count in other.top_majors.items():
+            self.top_majors[major] = self.top_majors.get(major, 0) + count
+        for major, count in other.major_counts.items():
+            self.major_counts[major] = self.major_counts.get(major, 0) + count
+            self.score_sums[major] = self.score_sums.get(major, 0) + other.score_sums[major]
+            histogram = self.histograms.get(major)
+            if histogram is None:
+                self.histograms[major] = array("Q", other.histograms[major])
+            else:
+                for i, value in enumerate(other.histograms[major]):
+                    if value:
+                        histogram[i] += value
+        for i, value in enumerate(other.rule_fires):
+            self.rule_fires[i] += value
+        return self
+
+    def mean(self, major: str) -> float:
+        if not self.students or major not in self.score_sums:
+            return 0.0
+        return self.score_sums[major] / self.students / 1000
+
+    def quantile(self, major: str, fraction: float) -> float:
+        if major not in self.histograms:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.students))
+        seen = self.students - self.major_counts[major]
+        if seen >= rank:
+            return 0.0
+        for i, value in enumerate(self.histograms[major]):
+            seen += value
+            if seen >= rank:
+                return i / 1000
+        return 1.0
+
+    def fire_rates(self) -> Dict[str, float]:
+        if not self.students:
+            return {name: 0.0 for name in self.rule_names}
+        return {name: fires / self.students for name, fires in zip(self.rule_names, self.rule_fires)}
+
+    def to_dict(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict[str, object]:
+        majors: Dict[str, object] = {}
+        for major in sorted(self.major_counts, key=lambda m: -self.major_counts[m]):
+            summary: Dict[str, object] = {"count": self.major_counts[major], "mean": round(self.mean(major), 3)}
+            for fraction in quantiles:
+                summary[f"p{fraction * 100:g}"] = self.quantile(major, fraction)
+            majors[major] = summary
+        return {
+            "students": self.students,
+            "top_majors": dict(sorted(self.top_majors.items(), key=lambda item: -item[1])),
+            "majors": majors,
+            "rule_fire_rate": {name: round(rate, 4) for name, rate in self.fire_rates().items()},
         }
-        recs = self.recommender.recommend(facts)
-        self.assertGreater(len(recs), 0)
-        self.assertEqual(recs[0]["major"], "Desain Komunikasi Visual")
+
+
+def aggregate_cohort(
+    kb: KnowledgeBase, rows: Iterable[Tuple[object, List[Dict[str, object]], int]]
+) -> Dict[object, CohortStats]:
+    groups: Dict[object, CohortStats] = {}
+    for group, recommendations, fired in rows:
+        stats = groups.get(group)
+        if stats is None:
+            stats = groups[group] = CohortStats(kb)
+        stats.add(recommendations, fired)
+    return groups
+
+
+def merge_cohorts(*partials: Dict[object, CohortStats]) -> Dict[object, CohortStats]:
+    merged: Dict[object, CohortStats] = {}
+    for partial in partials:
+        for group, stats in partial.items():
+            if group not in merged:
+                merged[group] = CohortStats(stats.kb)
+            merged[group].merge(stats)
+    return merged
+
+
+PROFILE_LEAF_SIZE = 32
+
+
+@dataclass
+class SimilarProfile:
+    student_id: object
+    distance: float
+    recommendations: List[Tuple[str, float]]
+
+
+class ProfileIndex:
+    def __init__(self, kb: KnowledgeBase, top_n: int = 3) -> None:
+        self.kb = kb
+        self.top_n = top_n
+        flags = [("interests", value) for value in sorted(CLI.VALID_INTERESTS)]
+        flags += [("environment", value) for value in sorted(CLI.VALID_ENVIRONMENTS)]
+        flags += [("career_keywords", keyword) for keyword in kb.keyword_index.keywords]
+        self.flags: Tuple[Tuple[str, str], ...] = tuple(flags)
+        self._bits = {flag: 1 << position for position, flag in enumerate(flags)}
+        self._grades = array("d")
+        self._masks: List[int] = []
+        self._ids: List[object] = []
+        self._recommendations: List[Tuple[Tuple[str, float], ...]] = []
+        self._profile_bits = (1 << (len(CLI.VALID_INTERESTS) + len(CLI.VALID_ENVIRONMENTS))) - 1
+        self._buckets: Dict[int, List[int]] = {}
+        self._groups: Dict[int, List[int]] = {}
+        self._trees: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def vector(self, facts: Dict[str, object]) -> Tuple[Tuple[float, ...], int]:
+        facts = self.kb.derive_facts(facts)
+        bits = self._bits
+        mask = 0
+        for interest in facts["interests"]:
+            mask |= bits.get(("interests", interest), 0)
+        mask |= bits.get(("environment", facts["environment"]), 0)
+        for keyword in facts["career_keywords"]:
+            mask |= bits.get(("career_keywords", keyword), 0)
+        return tuple(float(facts[field]) / 100 for field in GRADE_FIELDS), mask
+
+    def add(self, student_id: object, facts: Dict[str, object], recommendations: List[Dict[str, object]]) -> None:
+        grades, mask = self.vector(facts)
+        row = len(self._ids)
+        self._grades.extend(grades)
+        self._masks.append(mask)
+        self._ids.append(student_id)
+        self._recommendations.append(tuple((r["major"], r["score"]) for r in recommendations[: self.top_n]))
+        bucket = self._buckets.get(mask)
+        if bucket is None:
+            bucket = self._buckets[mask] = []
+            self._groups.setdefault(mask & self._profile_bits, []).append(mask)
+        bucket.append(row)
+        self._trees.pop(mask, None)
+
+    def add_batch(self, recommender: Recommender, rows: Iterable[Tuple[object, Dict[str, object]]]) -> None:
+        for chunk in _chunked(rows, 1024):
+            ranked = recommender.recommend_batch([facts for _, facts in chunk], self.top_n, explain=False)
+            for (student_id, facts), recommendations in zip(chunk, ranked):
+                self.add(student_id, facts, recommendations)
+
+    def _build_tree(self, rows: List[int]) -> object:
+        if len(rows) <= PROFILE_LEAF_SIZE:
+            return rows
+        grades = self._grades
+        width = len(GRADE_FIELDS)
+        best_dim, best_spread = 0, 0.0
+        for dim in range(width):
+            values = [grades[row * width + dim] for row in rows]
+            spread = max(values) - min(values)
+            if spread > best_spread:
+                best_dim, best_spread = dim, spread
+        if not best_spread:
+            return rows
+        rows = sorted(rows, key=lambda row: grades[row * width + best_dim])
+        middle = len(rows) // 2
+        split = grades[rows[middle] * width + best_dim]
+        return best_dim, split, self._build_tree(rows[:middle]), self._build_tree(rows[middle:])
+
+    def _tree(self, mask: int) -> object:
+        tree = self._trees.get(mask)
+        if tree is None:
+            tree = self._trees[mask] = self._build_tree(self._buckets[mask])
+        return tree
+
+    def build(self) -> None:
+        for mask in self._buckets:
+            self._tree(mask)
+
+    def nearest(self, facts: Dict[str, object], k: int = 5) -> List[SimilarProfile]:
+        if k <= 0:
+            return []
+        point, mask = self.vector(facts)
+        grades = self._grades
+        width = len(GRADE_FIELDS)
+        best: List[Tuple[float, int]] = []
+
+        def search(node: object, offset: float) -> None:
+            if isinstance(node, list):
+                for row in node:
+                    base = row * width
+                    distance = offset
+                    for dim in range(width):
+                        delta = grades[base + dim] - point[dim]
+                        distance += delta * delta
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, -row))
+                    elif (-distance, -row) > best[0]:
+                        heapq.heapreplace(best, (-distance, -row))
+                return
+            dim, split, low, high = node
+            gap = point[dim] - split
+            near, far = (low, high) if gap < 0 else (high, low)
+            search(near, offset)
+            if len(best) < k or offset + gap * gap <= -best[0][0]:
+                search(far, offset)
+
+        profile = mask & self._profile_bits
+        groups = sorted((bin(profile ^ other).count("1"), other) for other in self._groups)
+        for group_distance, group in groups:
+            if len(best) == k and group_distance > -best[0][0]:
+                break
+            buckets = sorted((bin(mask ^ other).count("1"), other) for other in self._groups[group])
+            for hamming, other in buckets:
+                if len(best) == k and hamming > -best[0][0]:
+                    break
+                search(self._tree(other), float(hamming))
+
+        return [
+            SimilarProfile(self._ids[-row], math.sqrt(-distance), list(self._recommendations[-row]))
+            for distance, row in sorted(best, reverse=True)
+        ]
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _recommendation_to_json(
+    recommender: Recommender, recommendation: Dict[str, object], explain: bool
+) -> Dict[str, object]:
+    result: Dict[str, object] = {"major": recommendation["major"], "score": recommendation["score"]}
+    if explain:
+        result["explanations"] = [
+            {"rule": fired.rule.name, "weight": fired.rule.weight, "explanation": fired.explanation}
+            for fired in recommender.explain(recommendation)
+        ]
+    return result
+
+
+def handle_payload(recommender: Recommender, payload: object) -> Dict[str, object]:
+    if not isinstance(payload, dict):
+        raise ValueError("Payload harus berupa objek JSON.")
+    if "students" in payload:
+        records = payload["students"]
+        if not isinstance(records, list):
+            raise ValueError("Field 'students' harus berupa list.")
+    elif "facts" in payload:
+        records = [payload["facts"]]
+    else:
+        raise ValueError("Payload harus berisi 'facts' atau 'students'.")
+    try:
+        top_n = int(payload.get("top_n", 3))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("Field 'top_n' harus berupa angka.") from None
+    explain = bool(payload.get("explain", False))
+
+    rows = [_validate_record(position, record) for position, record in enumerate(records, start=1)]
+
+    ranked = iter(
+        recommender.recommend_batch([facts for _, facts, _ in rows if facts is not None], top_n, explain=False)
+    )
+    results: List[Dict[str, object]] = []
+    for student_id, facts, error in rows:
+        if facts is None:
+            results.append({"id": student_id, "error": error})
+        else:
+            results.append(
+                {
+                    "id": student_id,
+                    "recommendations": [_recommendation_to_json(recommender, r, explain) for r in next(ranked)],
+                }
+            )
+    if "students" in payload:
+        return {"results": results}
+    return results[0]
+
+
+def _worker_handle_payload(payload: object) -> Dict[str, object]:
+    return handle_payload(_worker_recommender, payload)
+
+
+class RecommendationService:
+    MAX_BODY_BYTES = 16 * 1024 * 1024
+    READ_TIMEOUT = 30.0
+    REASONS = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        405: "Method Not Allowed",
+        408: "Request Timeout",
+        413: "Payload Too Large",
+        500: "Internal Server Error",
+        503: "Service Unavailable",
+    }
+
+    def __init__(
+        self,
+        recommender: Union[Recommender, ReloadingRecommender],
+        max_pending: int = 64,
+        workers: int = 0,
+    ) -> None:
+        self.recommender = recommender
+        self.max_pending = max_pending
+        self.pending = 0
+        self.workers = workers
+        self.executor: Optional[concurrent.futures.Executor] = None
+        self._executor_kb: Optional[KnowledgeBase] = None
+
+    def current(self) -> Recommender:
+        if isinstance(self.recommender, ReloadingRecommender):
+            return self.recommender.current
+        return self.recommender
+
+    def _executor_for(self, recommender: Recommender) -> concurrent.futures.Executor:
+        if self._executor_kb is not recommender.kb:
+            previous = self.executor
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(recommender.kb.rules,)
+            )
+            self._executor_kb = recommender.kb
+            if previous is not None:
+                previous.shutdown(wait=False)
+        return self.executor
+
+    async def submit(self, payload: object) -> Dict[str, object]:
+        if self.pending >= self.max_pending:
+            raise ServiceBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            recommender = self.current()
+            if not self.workers:
+                return await loop.run_in_executor(None, handle_payload, recommender, payload)
+            executor = self._executor_for(recommender)
+            return await loop.run_in_executor(executor, _worker_handle_payload, payload)
+        finally:
+            self.pending -= 1
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > self.MAX_BODY_BYTES:
+            raise OverflowError(length)
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path, body
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, object]]:
+        try:
+            method, path, body = await asyncio.wait_for(self._read_request(reader), self.READ_TIMEOUT)
+        except asyncio.TimeoutError:
+            return 408, {"error": "Waktu membaca request habis."}
+        except OverflowError:
+            return 413, {"error": "Payload terlalu besar."}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            return 400, {"error": "Request HTTP tidak valid."}
+
+        if path == "/health":
+            return 200, {"status": "ok", "pending": self.pending, "rules": len(self.current().kb.rules)}
+        if path != "/recommend":
+            return 404, {"error": f"Path tidak dikenal: {path}"}
+        if method != "POST":
+            return 405, {"error": "Gunakan metode POST."}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {"error": "Body harus berupa JSON."}
+        try:
+            return 200, await self.submit(payload)
+        except ServiceBusy:
+            return 503, {"error": "Server sedang sibuk, coba lagi."}
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+        except Exception as exc:
+            print(f"Gagal memproses request: {exc!r}", file=sys.stderr)
+            return 500, {"error": "Terjadi kesalahan internal."}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, body = await self._dispatch(reader)
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            headers = [
+                f"HTTP/1.1 {status} {self.REASONS[status]}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(data)}",
+                "Connection: close",
+            ]
+            if status == 503:
+                headers.append("Retry-After: 1")
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+async def _watch_rules(reloading: ReloadingRecommender, interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await loop.run_in_executor(None, reloading.maybe_reload):
+                print(f"Rule dimuat ulang dari {reloading.path}", file=sys.stderr)
+        except Exception as exc:
+            print(f"Gagal memuat ulang rule, tetap memakai versi lama: {exc}", file=sys.stderr)
+
+
+async def serve(service: RecommendationService, host: str, port: int, reload_interval: float = 2.0) -> None:
+    server = await service.start(host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Layanan rekomendasi berjalan di {addresses}", file=sys.stderr)
+    watcher = None
+    if isinstance(service.recommender, ReloadingRecommender):
+        watcher = asyncio.create_task(_watch_rules(service.recommender, reload_interval))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        service.close()
+
+
+def _detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _open_stream(path: str, mode: str) -> TextIO:
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    encoding = "utf-8-sig" if "r" in mode else "utf-8"
+    return open(path, mode, encoding=encoding, newline="")
 
 
 def main() -> None:
-    if len(sys.argv) > 1 and sys.argv[1] == "--test":
-        suite = unittest.defaultTestLoader.loadTestsFromTestCase(RecommendationTests)
+    parser = argparse.ArgumentParser(description="Rekomendasi jurusan kuliah (expert system).")
+    parser.add_argument("--test", action="store_true", help="jalankan unit test")
+    parser.add_argument(
+        "--batch",
+        nargs=2,
+        metavar=("INPUT", "OUTPUT"),
+        help="proses data siswa dari CSV/JSONL ke JSONL, atau ke file kolumnar jika OUTPUT berakhiran .esr",
+    )
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="format input batch")
+    parser.add_argument("--top", type=int, default=3, help="jumlah rekomendasi per siswa")
+    parser.add_argument("--workers", type=int, default=1, help="jumlah proses paralel untuk mode batch/server")
+    parser.add_argument("--serve", action="store_true", help="jalankan layanan HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="alamat layanan HTTP")
+    parser.add_argument("--port", type=int, default=8080, help="port layanan HTTP")
+    parser.add_argument("--max-pending", type=int, default=64, help="batas request yang diproses bersamaan")
+    parser.add_argument("--rules", help="file rule JSON/YAML atau snapshot .pkl sebagai pengganti rule bawaan")
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="detik antar pengecekan file rule")
+    parser.add_argument(
+        "--compile-rules",
+        nargs=2,
+        metavar=("RULES", "SNAPSHOT"),
+        help="validasi file rule lalu simpan sebagai snapshot biner",
+    )
+    parser.add_argument("--export-rules", metavar="PATH", help="simpan rule aktif sebagai file JSON")
+    parser.add_argument(
+        "--sweep",
+        metavar="FACTS",
+        help="tabel sensitivitas nilai 0-100 untuk semua kombinasi minat dan lingkungan dari file JSON profil dasar",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="simpan statistik per rule dari mode batch (.prom untuk format Prometheus, selain itu JSON)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="jalankan batch sebagai job yang bisa dilanjutkan (checkpoint di OUTPUT.ckpt)",
+    )
+    parser.add_argument(
+        "--previous",
+        metavar="OUTPUT",
+        help="output job sebelumnya; siswa dengan fakta yang sama dan rule yang sama tidak dihitung ulang",
+    )
+    args = parser.parse_args()
+    if args.profile and args.workers > 1:
+        parser.error("--profile hanya bisa dipakai dengan --workers 1")
+    if args.previous and not args.checkpoint:
+        parser.error("--previous hanya bisa dipakai dengan --checkpoint")
+
+    if args.test:
+        import unittest
+
+        import test_expert_system
+
+        suite = unittest.defaultTestLoader.loadTestsFromModule(test_expert_system)
         runner = unittest.TextTestRunner(verbosity=2)
         result = runner.run(suite)
         sys.exit(not result.wasSuccessful())
-    CLI().run()
+    if args.compile_rules:
+        source, target = args.compile_rules
+        kb = KnowledgeBase(load_rule_file(source))
+        kb.save_snapshot(target)
+        print(f"Snapshot {len(kb.rules)} rule disimpan ke {target}.", file=sys.stderr)
+        return
+    kb = load_knowledge_base(args.rules) if args.rules else None
+    if args.export_rules:
+        save_rule_file((kb or KnowledgeBase()).rules, args.export_rules)
+        return
+    if args.sweep:
+        with open(args.sweep, encoding="utf-8") as handle:
+            base_facts = record_to_facts(json.load(handle))
+        for row in sensitivity_sweep(build_recommender(kb=kb), base_facts, top_n=args.top):
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    if args.batch:
+        input_path, output_path = args.batch
+        fmt = args.format or _detect_format(input_path)
+        if args.checkpoint:
+            if "-" in (input_path, output_path) or output_path.endswith(".esr"):
+                parser.error("--checkpoint membutuhkan file input dan file output JSONL")
+            processed, failed, reused = run_batch_job(
+                build_recommender(kb=kb), input_path, output_path, fmt, args.top, previous=args.previous
+            )
+            print(
+                f"Selesai: {processed} siswa diproses ({reused} dari hasil sebelumnya), {failed} data tidak valid.",
+                file=sys.stderr,
+            )
+            return
+        if output_path.endswith(".esr"):
+            if args.workers > 1 or args.profile:
+                parser.error("output .esr belum mendukung --workers atau --profile")
+
+            def report_error(student_id: object, error: str) -> None:
+                print(f"Data {student_id} tidak valid: {error}", file=sys.stderr)
+
+            input_stream = _open_stream(input_path, "r")
+            try:
+                processed, failed = run_batch_columnar(
+                    build_recommender(kb=kb), input_stream, output_path, fmt, args.top, error_sink=report_error
+                )
+            finally:
+                if input_stream is not sys.stdin:
+                    input_stream.close()
+            print(f"Selesai: {processed} siswa diproses, {failed} data tidak valid.", file=sys.stderr)
+            return
+        input_stream = _open_stream(input_path, "r")
+        output_stream = _open_stream(output_path, "w")
+        recommender = build_recommender(kb=kb, profile=bool(args.profile))
+        try:
+            processed, failed = run_batch(
+                recommender, input_stream, output_stream, fmt, args.top, workers=args.workers
+            )
+        finally:
+            for stream in (input_stream, output_stream):
+                if stream not in (sys.stdin, sys.stdout):
+                    stream.close()
+        print(f"Selesai: {processed} siswa diproses, {failed} data tidak valid.", file=sys.stderr)
+        if args.profile:
+            profiler = recommender.engine.profiler
+            with open(args.profile, "w", encoding="utf-8") as handle:
+                handle.write(profiler.to_prometheus() if args.profile.endswith(".prom") else profiler.to_json())
+        return
+    if args.serve:
+        workers = args.workers if args.workers > 1 else 0
+        recommender = ReloadingRecommender(args.rules) if args.rules else build_recommender()
+        service = RecommendationService(recommender, args.max_pending, workers)
+        try:
+            asyncio.run(serve(service, args.host, args.port, args.reload_interval))
+        except KeyboardInterrupt:
+            pass
+        return
+    CLI(kb).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,1299 @@
+"""Inti penilaian expert system rekomendasi jurusan: knowledge base, mesin inferensi, dan recommender.
+"""
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+import heapq
+import math
+import os
+import time
+
+
+GRADE_FIELDS = ("math", "physics", "biology", "chemistry", "language")
+
+Clause = Tuple[object, ...]
+Predicate = Callable[[Dict[str, object]], bool]
+SNAPSHOT_FORMAT = "expert-system-kb/1"
+SNAPSHOT_SUFFIXES = (".pkl", ".pickle")
+
+
+def compile_clause(clause: Clause) -> Predicate:
+    kind = clause[0]
+    if kind == "interests":
+        wanted = clause[1]
+        return lambda f: not wanted.isdisjoint(f["interests"])
+    if kind == "grade":
+        subject, threshold = clause[1], clause[2]
+        return lambda f: f[subject] >= threshold
+    if kind == "environment":
+        options = clause[1]
+        return lambda f: f["environment"] in options
+    if kind == "career":
+        keywords = frozenset(clause[1])
+        return lambda f: not keywords.isdisjoint(f["career_keywords"])
+    raise ValueError(f"Jenis klausa tidak dikenal: {kind!r}")
+
+
+def clause_facts(clause: Clause) -> Tuple[str, ...]:
+    kind = clause[0]
+    if kind == "grade":
+        return (clause[1],)
+    if kind == "career":
+        return ("career_goal", "career_keywords")
+    return (kind,)
+
+
+def _mask_from_flags(flags: Iterable[object]) -> int:
+    bits = "".join(["1" if flag else "0" for flag in flags])
+    return int(bits[::-1], 2) if bits else 0
+
+
+def _set_bits(mask: int) -> Iterator[int]:
+    bits = bin(mask)[:1:-1]
+    pos = bits.find("1")
+    while pos != -1:
+        yield pos
+        pos = bits.find("1", pos + 1)
+
+
+class _Record:
+    __slots__ = ()
+    __hash__ = None
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__qualname__}({fields})"
+
+    def _values(self) -> List[object]:
+        return [getattr(self, name) for name in self.__slots__]
+
+
+class Rule(_Record):
+    __slots__ = (
+        "name",
+        "major",
+        "weight",
+        "explanation",
+        "interests",
+        "min_grades",
+        "environments",
+        "career_keywords",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        major: str,
+        weight: float,
+        explanation: str,
+        interests: Iterable[str] = frozenset(),
+        min_grades: Optional[Dict[str, float]] = None,
+        environments: Iterable[str] = frozenset(),
+        career_keywords: Iterable[str] = (),
+    ) -> None:
+        self.name = name
+        self.major = major
+        self.weight = weight
+        self.explanation = explanation
+        self.interests: FrozenSet[str] = frozenset(interests)
+        self.min_grades: Dict[str, float] = {} if min_grades is None else min_grades
+        self.environments: FrozenSet[str] = frozenset(environments)
+        self.career_keywords: Tuple[str, ...] = tuple(career_keywords)
+
+    def clauses(self) -> List[Clause]:
+        clauses: List[Clause] = []
+        if self.interests:
+            clauses.append(("interests", self.interests))
+        for subject, threshold in self.min_grades.items():
+            clauses.append(("grade", subject, threshold))
+        if self.environments:
+            clauses.append(("environment", self.environments))
+        if self.career_keywords:
+            clauses.append(("career", self.career_keywords))
+        return clauses
+
+    def condition(self, facts: Dict[str, object]) -> Tuple[bool, str]:
+        if "career_keywords" not in facts:
+            goal = facts["career_goal"]
+            facts = {**facts, "career_keywords": frozenset(k for k in self.career_keywords if k in goal)}
+        matched = all(compile_clause(clause)(facts) for clause in self.clauses())
+        return matched, self.explanation
+
+
+class KeywordIndex:
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self._delta: List[Dict[str, int]] = [{}]
+        self._output: List[FrozenSet[str]] = [frozenset()]
+        self._build()
+
+    def _build(self) -> None:
+        delta, output = self._delta, self._output
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in delta[state]:
+                    delta[state][ch] = len(delta)
+                    delta.append({})
+                    output.append(frozenset())
+                state = delta[state][ch]
+            output[state] = output[state] | {keyword}
+
+        fail = [0] * len(delta)
+        queue = list(delta[0].values())
+        for state in queue:
+            for ch, child in delta[state].items():
+                queue.append(child)
+                if state:
+                    fallback = fail[state]
+                    while fallback and ch not in delta[fallback]:
+                        fallback = fail[fallback]
+                    fail[child] = delta[fallback].get(ch, 0)
+                output[child] = output[child] | output[fail[child]]
+            if state:
+                for ch, target in delta[fail[state]].items():
+                    delta[state].setdefault(ch, target)
+
+    def find(self, text: str) -> FrozenSet[str]:
+        delta, output = self._delta, self._output
+        found: FrozenSet[str] = frozenset()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                found = found | output[state]
+        return found
+
+
+class KnowledgeBase:
+    frozen = False
+
+    def __init__(self, rules: Optional[Iterable[Rule]] = None) -> None:
+        self.version = 0
+        self._load(self._build_rules() if rules is None else rules)
+
+    def set_rules(self, rules: Iterable[Rule]) -> None:
+        if self.frozen:
+            raise ValueError("Knowledge base bersama tidak bisa diubah; buat KnowledgeBase() sendiri.")
+        self._load(rules)
+        self.version += 1
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "KnowledgeBase":
+        import pickle
+
+        with open(path, "rb") as handle:
+            try:
+                snapshot = pickle.load(handle)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, TypeError) as exc:
+                raise ValueError(f"Snapshot knowledge base rusak: {path} ({exc!r})") from None
+        if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Snapshot knowledge base tidak dikenal: {path}")
+        kb = cls.__new__(cls)
+        kb.version = 0
+        try:
+            kb._load(snapshot["rules"], snapshot["total_weight_per_major"], snapshot["keyword_index"])
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"Snapshot knowledge base tidak lengkap: {path} ({exc!r})") from None
+        return kb
+
+    def save_snapshot(self, path: str) -> None:
+        import pickle
+
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "rules": self.rules,
+            "total_weight_per_major": self.total_weight_per_major,
+            "keyword_index": self.keyword_index,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            pickle.dump(snapshot, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _load(
+        self,
+        rules: Iterable[Rule],
+        total_weight_per_major: Optional[Dict[str, float]] = None,
+        keyword_index: Optional[KeywordIndex] = None,
+    ) -> None:
+        self.rules: List[Rule] = list(rules)
+        if total_weight_per_major is None:
+            total_weight_per_major = self._compute_total_weights()
+        self.total_weight_per_major: Dict[str, float] = dict(total_weight_per_major)
+        self.major_order: Dict[str, int] = {major: i for i, major in enumerate(self.total_weight_per_major)}
+        self.major_masks: Dict[str, int] = {}
+        for i, rule in enumerate(self.rules):
+            self.major_masks[rule.major] = self.major_masks.get(rule.major, 0) | (1 << i)
+        if keyword_index is None:
+            keyword_index = KeywordIndex(k for rule in self.rules for k in rule.career_keywords)
+        self.keyword_index = keyword_index
+        self.clauses: List[Clause] = []
+        self.predicates: List[Predicate] = []
+        self.rule_clauses: List[Tuple[int, ...]] = self._compile_rules()
+        self.rules_by_fact: Dict[str, int] = {}
+        for i, clause_ids in enumerate(self.rule_clauses):
+            for idx in clause_ids:
+                for name in clause_facts(self.clauses[idx]):
+                    self.rules_by_fact[name] = self.rules_by_fact.get(name, 0) | (1 << i)
+
+    def _build_rules(self) -> List[Rule]:
+        return [
+            Rule(
+                name="TI-Interes-Investigative",
+                major="Teknik Informatika",
+                weight=0.25,
+                interests={"Investigative"},
+                min_grades={"math": 85},
+                explanation="Minat Investigative dan nilai Matematika tinggi mendukung logika pemrograman.",
+            ),
+            Rule(
+                name="TI-Environment-Industry",
+                major="Teknik Informatika",
+                weight=0.2,
+                environments={"industri", "riset"},
+                explanation="Preferensi lingkungan industri/riset cocok dengan proyek pengembangan perangkat lunak.",
+            ),
+            Rule(
+                name="TI-Career-Tech",
+                major="Teknik Informatika",
+                weight=0.15,
+                career_keywords=("developer", "software", "data", "AI", "robot"),
+                explanation="Tujuan karier di bidang teknologi sesuai dengan proyeksi TI.",
+            ),
+            Rule(
+                name="TI-Creative-Blend",
+                major="Teknik Informatika",
+                weight=0.15,
+                interests={"Artistic"},
+                environments={"kreatif"},
+                explanation="Kombinasi lingkungan kreatif dan minat Artistic membuka jalur UI/UX dan front-end.",
+            ),
+            Rule(
+                name="SI-Structured",
+                major="Sistem Informasi",
+                weight=0.25,
+                interests={"Conventional"},
+                min_grades={"math": 75},
+                explanation="Minat Conventional dan dasar Matematika memadai untuk analisis sistem.",
+            ),
+            Rule(
+                name="SI-Industry",
+                major="Sistem Informasi",
+                weight=0.2,
+                environments={"industri"},
+                explanation="Preferensi industri cocok dengan penerapan SI di organisasi.",
+            ),
+            Rule(
+                name="SI-Career-BusinessIT",
+                major="Sistem Informasi",
+                weight=0.15,
+                career_keywords=("analyst", "bisnis", "system"),
+                explanation="Tujuan karier analisis sistem/teknologi bisnis mendukung SI.",
+            ),
+            Rule(
+                name="Elektro-STEM",
+                major="Teknik Elektro",
+                weight=0.3,
+                interests={"Realistic"},
+                min_grades={"math": 80, "physics": 80},
+                explanation="Minat Realistic dan nilai Matematika/Fisika tinggi penting untuk rekayasa listrik.",
+            ),
+            Rule(
+                name="Elektro-Riset",
+                major="Teknik Elektro",
+                weight=0.2,
+                environments={"industri", "riset"},
+                explanation="Preferensi riset/industri sejalan dengan eksperimen elektronika.",
+            ),
+            Rule(
+                name="Mesin-STEM",
+                major="Teknik Mesin",
+                weight=0.3,
+                interests={"Realistic"},
+                min_grades={"math": 75, "physics": 75},
+                explanation="Minat Realistic dan dasar Matematika/Fisika baik untuk mekanika.",
+            ),
+            Rule(
+                name="Mesin-Industry",
+                major="Teknik Mesin",
+                weight=0.2,
+                environments={"industri"},
+                explanation="Preferensi industri cocok dengan manufaktur dan produksi.",
+            ),
+            Rule(
+                name="Kedokteran-Bio",
+                major="Kedokteran",
+                weight=0.35,
+                interests={"Social"},
+                min_grades={"biology": 85, "chemistry": 80},
+                explanation="Minat Social serta nilai Biologi/Kimia tinggi diperlukan untuk profesi dokter.",
+            ),
+            Rule(
+                name="Kedokteran-Career",
+                major="Kedokteran",
+                weight=0.2,
+                career_keywords=("dokter", "medis", "kesehatan"),
+                explanation="Tujuan karier medis menguatkan pilihan Kedokteran.",
+            ),
+            Rule(
+                name="Farmasi-Science",
+                major="Farmasi",
+                weight=0.3,
+                interests={"Investigative"},
+                min_grades={"chemistry": 85},
+                explanation="Minat Investigative dan nilai Kimia tinggi sesuai eksperimen obat.",
+            ),
+            Rule(
+                name="Farmasi-Bio",
+                major="Farmasi",
+                weight=0.2,
+                min_grades={"biology": 80},
+                explanation="Penguasaan Biologi mendukung pemahaman farmakologi.",
+            ),
+            Rule(
+                name="Farmasi-Career",
+                major="Farmasi",
+                weight=0.15,
+                career_keywords=("farmasi", "apotek", "apoteker", "obat"),
+                explanation="Tujuan karier di bidang farmasi memperkuat kecocokan.",
+            ),
+            Rule(
+                name="Keperawatan-Social",
+                major="Keperawatan",
+                weight=0.3,
+                interests={"Social"},
+                min_grades={"biology": 80},
+                explanation="Minat Social dan Biologi tinggi mendukung perawatan pasien.",
+            ),
+            Rule(
+                name="Keperawatan-Career",
+                major="Keperawatan",
+                weight=0.2,
+                career_keywords=("perawat", "care", "nurse"),
+                explanation="Tujuan karier keperawatan memperkuat pilihan.",
+            ),
+            Rule(
+                name="Biologi-Riset",
+                major="Biologi",
+                weight=0.3,
+                interests={"Investigative"},
+                min_grades={"biology": 85},
+                explanation="Minat Investigative dan nilai Biologi tinggi cocok untuk riset hayati.",
+            ),
+            Rule(
+                name="Biologi-Environment",
+                major="Biologi",
+                weight=0.2,
+                environments={"riset"},
+                explanation="Preferensi riset mendukung kegiatan laboratorium Biologi.",
+            ),
+            Rule(
+                name="Kimia-Riset",
+                major="Kimia",
+                weight=0.3,
+                interests={"Investigative"},
+                min_grades={"chemistry": 85},
+                explanation="Minat Investigative dan Kimia tinggi diperlukan untuk riset kimia.",
+            ),
+            Rule(
+                name="Kimia-Environment",
+                major="Kimia",
+                weight=0.2,
+                environments={"riset"},
+                explanation="Preferensi riset sesuai eksperimen laboratorium Kimia.",
+            ),
+            Rule(
+                name="Kimia-Career",
+                major="Kimia",
+                weight=0.15,
+                career_keywords=("kimia", "chemist", "laboratorium"),
+                explanation="Tujuan karier kimia memperkuat fokus eksperimen dan sintesis.",
+            ),
+            Rule(
+                name="Hukum-Social",
+                major="Hukum",
+                weight=0.3,
+                interests={"Enterprising", "Social"},
+                min_grades={"language": 80},
+                explanation="Minat Enterprising/Social serta Bahasa tinggi penting untuk advokasi hukum.",
+            ),
+            Rule(
+                name="Hukum-Career",
+                major="Hukum",
+                weight=0.2,
+                career_keywords=("hukum", "law", "advokat", "jaksa"),
+                explanation="Tujuan karier hukum memperkuat pilihan.",
+            ),
+            Rule(
+                name="Psikologi-Social",
+                major="Psikologi",
+                weight=0.3,
+                interests={"Social", "Artistic"},
+                min_grades={"language": 78},
+                explanation="Minat Social/Artistic dan Bahasa memadai untuk komunikasi psikologi.",
+            ),
+            Rule(
+                name="Psikologi-Career",
+                major="Psikologi",
+                weight=0.2,
+                career_keywords=("psiko", "konselor", "terapis"),
+                explanation="Tujuan karier konseling/terapi sesuai Psikologi.",
+            ),
+            Rule(
+                name="Akuntansi-Conventional",
+                major="Akuntansi",
+                weight=0.3,
+                interests={"Conventional"},
+                min_grades={"math": 78},
+                explanation="Minat Conventional dan Matematika tinggi mendukung pencatatan keuangan.",
+            ),
+            Rule(
+                name="Akuntansi-Career",
+                major="Akuntansi",
+                weight=0.2,
+                career_keywords=("akuntan",),
+                explanation="Tujuan karier akuntan memperkuat jurusan.",
+            ),
+            Rule(
+                name="Manajemen-Enterprising",
+                major="Manajemen",
+                weight=0.25,
+                interests={"Enterprising"},
+                min_grades={"math": 75},
+                explanation="Minat Enterprising dan dasar numerik baik untuk pengambilan keputusan bisnis.",
+            ),
+            Rule(
+                name="Manajemen-Industry",
+                major="Manajemen",
+                weight=0.15,
+                environments={"industri"},
+                explanation="Preferensi industri sesuai praktik manajerial perusahaan.",
+            ),
+            Rule(
+                name="Manajemen-Career",
+                major="Manajemen",
+                weight=0.15,
+                career_keywords=("manager", "bisnis", "entrepreneur"),
+                explanation="Tujuan karier manajerial/bisnis mendukung jurusan.",
+            ),
+            Rule(
+                name="Ekonomi-Analyst",
+                major="Ekonomi",
+                weight=0.25,
+                interests={"Investigative", "Enterprising"},
+                min_grades={"math": 75},
+                explanation="Minat Investigative/Enterprising serta Matematika cukup untuk analisis ekonomi.",
+            ),
+            Rule(
+                name="Ekonomi-Career",
+                major="Ekonomi",
+                weight=0.15,
+                career_keywords=("ekonomi", "analis", "riset pasar"),
+                explanation="Tujuan karier analis ekonomi memperkuat jurusan.",
+            ),
+            Rule(
+                name="Statistika-StrongMath",
+                major="Statistika",
+                weight=0.35,
+                interests={"Investigative"},
+                min_grades={"math": 88},
+                explanation="Minat Investigative dan Matematika sangat tinggi kunci Statistika.",
+            ),
+            Rule(
+                name="Statistika-Riset",
+                major="Statistika",
+                weight=0.2,
+                environments={"riset"},
+                explanation="Preferensi riset sesuai pengembangan model statistik.",
+            ),
+            Rule(
+                name="Statistika-Career",
+                major="Statistika",
+                weight=0.15,
+                career_keywords=("statistik", "data", "analitik"),
+                explanation="Tujuan karier analitik/data science mendukung Statistika.",
+            ),
+            Rule(
+                name="DKV-Art",
+                major="Desain Komunikasi Visual",
+                weight=0.35,
+                interests={"Artistic"},
+                environments={"kreatif"},
+                explanation="Minat Artistic dan lingkungan kreatif identik dengan DKV.",
+            ),
+            Rule(
+                name="DKV-Career",
+                major="Desain Komunikasi Visual",
+                weight=0.2,
+                career_keywords=("desain", "designer", "grafis"),
+                explanation="Tujuan karier desain memperkuat jurusan DKV.",
+            ),
+        ]
+
+    def _compute_total_weights(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for rule in self.rules:
+            totals[rule.major] = totals.get(rule.major, 0.0) + rule.weight
+        return totals
+
+    def _compile_rules(self) -> List[Tuple[int, ...]]:
+        index: Dict[Clause, int] = {}
+        self.clauses = []
+        self.predicates = []
+        rule_clauses: List[Tuple[int, ...]] = []
+        for rule in self.rules:
+            ids: List[int] = []
+            for clause in rule.clauses():
+                if clause not in index:
+                    index[clause] = len(self.predicates)
+                    self.clauses.append(clause)
+                    self.predicates.append(compile_clause(clause))
+                ids.append(index[clause])
+            rule_clauses.append(tuple(ids))
+        return rule_clauses
+
+    def fingerprint(self) -> str:
+        import hashlib
+        import json
+
+        rules = [
+            [
+                rule.name,
+                rule.major,
+                rule.weight,
+                rule.explanation,
+                sorted(rule.interests),
+                sorted(rule.min_grades.items()),
+                sorted(rule.environments),
+                list(rule.career_keywords),
+            ]
+            for rule in self.rules
+        ]
+        totals = sorted(self.total_weight_per_major.items())
+        payload = json.dumps([rules, totals], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def derive_facts(self, facts: Dict[str, object]) -> Dict[str, object]:
+        if "career_keywords" in facts:
+            return facts
+        return {**facts, "career_keywords": self.keyword_index.find(facts["career_goal"])}
+
+    def matched_weights(self, fired: int) -> Dict[str, float]:
+        rules = self.rules
+        matched_weight: Dict[str, float] = {}
+        for i in _set_bits(fired):
+            rule = rules[i]
+            matched_weight[rule.major] = matched_weight.get(rule.major, 0.0) + rule.weight
+        return matched_weight
+
+    def explain(self, fired: int) -> List["FiredRule"]:
+        rules = self.rules
+        return [FiredRule(rule=rules[i], explanation=rules[i].explanation) for i in _set_bits(fired)]
+
+
+class FiredRule(_Record):
+    __slots__ = ("rule", "explanation")
+
+    def __init__(self, rule: Rule, explanation: str) -> None:
+        self.rule = rule
+        self.explanation = explanation
+
+
+class ClauseStatistics(_Record):
+    __slots__ = ("evaluations", "passes", "seconds")
+
+    def __init__(self, evaluations: List[int], passes: List[int], seconds: List[float]) -> None:
+        self.evaluations = evaluations
+        self.passes = passes
+        self.seconds = seconds
+
+    @classmethod
+    def collect(cls, kb: KnowledgeBase, sample: Iterable[Dict[str, object]]) -> "ClauseStatistics":
+        count = len(kb.predicates)
+        stats = cls([0] * count, [0] * count, [0.0] * count)
+        clock = time.perf_counter
+        for facts in sample:
+            facts = kb.derive_facts(facts)
+            for idx, predicate in enumerate(kb.predicates):
+                started = clock()
+                passed = predicate(facts)
+                stats.seconds[idx] += clock() - started
+                stats.evaluations[idx] += 1
+                stats.passes[idx] += bool(passed)
+        return stats
+
+    def pass_rate(self, idx: int) -> float:
+        return self.passes[idx] / self.evaluations[idx] if self.evaluations[idx] else 1.0
+
+    def cost(self, idx: int) -> float:
+        return self.seconds[idx] / self.evaluations[idx] if self.evaluations[idx] else 0.0
+
+    def rejection_cost(self, idx: int) -> float:
+        rejection = 1.0 - self.pass_rate(idx)
+        return self.cost(idx) / rejection if rejection > 0 else float("inf")
+
+
+EvaluationPlan = List[Tuple[int, Tuple[int, ...]]]
+
+
+def plan_evaluation_order(kb: KnowledgeBase, stats: ClauseStatistics) -> EvaluationPlan:
+    plan: EvaluationPlan = []
+    for i, clause_ids in enumerate(kb.rule_clauses):
+        plan.append((i, tuple(sorted(clause_ids, key=lambda idx: (stats.rejection_cost(idx), idx)))))
+    plan.sort(key=lambda step: (stats.rejection_cost(step[1][0]) if step[1] else float("inf"), step[0]))
+    return plan
+
+
+class InferenceEngine:
+    columnar = True
+
+    def __init__(self, kb: KnowledgeBase) -> None:
+        self.kb = kb
+        self.plan: Optional[EvaluationPlan] = None
+        self._plan_version: Optional[int] = None
+
+    def optimize(
+        self, sample: Iterable[Dict[str, object]] = (), stats: Optional[ClauseStatistics] = None
+    ) -> ClauseStatistics:
+        if stats is None:
+            stats = ClauseStatistics.collect(self.kb, sample)
+        self.plan = plan_evaluation_order(self.kb, stats)
+        self._plan_version = self.kb.version
+        return stats
+
+    def evaluation_order(self) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        if self.plan is not None and self._plan_version == self.kb.version:
+            return self.plan
+        return enumerate(self.kb.rule_clauses)
+
+    def infer(self, facts: Dict[str, object]) -> List[FiredRule]:
+        return self.kb.explain(self.infer_compact(facts))
+
+    def infer_compact(self, facts: Dict[str, object]) -> int:
+        return self._evaluate(self.kb.derive_facts(facts), self.evaluation_order())
+
+    def infer_subset(self, facts: Dict[str, object], rule_mask: int) -> int:
+        rule_clauses = self.kb.rule_clauses
+        steps = ((i, rule_clauses[i]) for i in _set_bits(rule_mask))
+        return self._evaluate(self.kb.derive_facts(facts), steps)
+
+    def _evaluate(self, facts: Dict[str, object], steps: Iterable[Tuple[int, Tuple[int, ...]]]) -> int:
+        predicates = self.kb.predicates
+        results: List[Optional[bool]] = [None] * len(predicates)
+        fired = 0
+        for i, clause_ids in steps:
+            for idx in clause_ids:
+                value = results[idx]
+                if value is None:
+                    value = results[idx] = predicates[idx](facts)
+                if not value:
+                    break
+            else:
+                fired |= 1 << i
+        return fired
+
+
+class IndexedInferenceEngine(InferenceEngine):
+    def __init__(self, kb: KnowledgeBase) -> None:
+        super().__init__(kb)
+        self._build_index()
+
+    def _build_index(self) -> None:
+        self._version = self.kb.version
+        self._always: List[int] = []
+        self._by_interest: Dict[str, List[int]] = {}
+        self._by_environment: Dict[str, List[int]] = {}
+        self._by_keyword: Dict[str, List[int]] = {}
+        self._grade_cuts: Dict[str, List[float]] = {}
+        self._grade_groups: Dict[str, List[List[int]]] = {}
+        self._residual: List[Tuple[int, ...]] = []
+        grade_rules: Dict[str, Dict[float, List[int]]] = {}
+        orders = dict(self.evaluation_order())
+        for i, clause_ids in enumerate(self.kb.rule_clauses):
+            clauses = [self.kb.clauses[idx] for idx in clause_ids]
+            anchor = self._choose_anchor(clauses)
+            residual = list(orders[i])
+            if anchor is None:
+                self._always.append(i)
+                self._residual.append(tuple(residual))
+                continue
+            residual.remove(clause_ids[anchor])
+            clause = clauses[anchor]
+            kind = clause[0]
+            if kind == "interests":
+                for name in clause[1]:
+                    self._by_interest.setdefault(name, []).append(i)
+            elif kind == "environment":
+                for env in clause[1]:
+                    self._by_environment.setdefault(env, []).append(i)
+            elif kind == "career":
+                for keyword in clause[1]:
+                    self._by_keyword.setdefault(keyword, []).append(i)
+            else:
+                grade_rules.setdefault(clause[1], {}).setdefault(clause[2], []).append(i)
+            self._residual.append(tuple(residual))
+
+        for subject, by_threshold in grade_rules.items():
+            cuts = sorted(by_threshold)
+            self._grade_cuts[subject] = cuts
+            self._grade_groups[subject] = [by_threshold[cut] for cut in cuts]
+
+    def optimize(
+        self, sample: Iterable[Dict[str, object]] = (), stats: Optional[ClauseStatistics] = None
+    ) -> ClauseStatistics:
+        stats = super().optimize(sample, stats)
+        self._build_index()
+        return stats
+
+    @staticmethod
+    def _choose_anchor(clauses: List[Clause]) -> Optional[int]:
+        for kind in ("interests", "environment", "career", "grade"):
+            for pos, clause in enumerate(clauses):
+                if clause[0] == kind:
+                    return pos
+        return None
+
+    def _candidates(self, facts: Dict[str, object]) -> List[int]:
+        candidates = set(self._always)
+        for name in facts["interests"]:
+            candidates.update(self._by_interest.get(name, ()))
+        candidates.update(self._by_environment.get(facts["environment"], ()))
+        for keyword in facts["career_keywords"]:
+            candidates.update(self._by_keyword.get(keyword, ()))
+        for subject, cuts in self._grade_cuts.items():
+            for group in self._grade_groups[subject][: bisect_right(cuts, facts[subject])]:
+                candidates.update(group)
+        return sorted(candidates)
+
+    def infer_compact(self, facts: Dict[str, object]) -> int:
+        if self._version != self.kb.version:
+            self._build_index()
+        facts = self.kb.derive_facts(facts)
+        predicates = self.kb.predicates
+        results: List[Optional[bool]] = [None] * len(predicates)
+        fired = 0
+        for i in self._candidates(facts):
+            for idx in self._residual[i]:
+                value = results[idx]
+                if value is None:
+                    value = results[idx] = predicates[idx](facts)
+                if not value:
+                    break
+            else:
+                fired |= 1 << i
+        return fired
+
+
+def _prometheus_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RuleProfiler:
+    SCORE_BUCKETS = 10
+
+    def __init__(self, kb: KnowledgeBase) -> None:
+        self.kb = kb
+        self.reset()
+
+    def reset(self) -> None:
+        self.version = self.kb.version
+        count = len(self.kb.rules)
+        self.students = 0
+        self.evaluations = [0] * count
+        self.fires = [0] * count
+        self.seconds = [0.0] * count
+        self.score_counts: Dict[str, List[int]] = {
+            major: [0] * self.SCORE_BUCKETS for major in self.kb.total_weight_per_major
+        }
+        self.score_sums: Dict[str, float] = {major: 0.0 for major in self.kb.total_weight_per_major}
+
+    def observe_scores(self, fired: int) -> None:
+        self.students += 1
+        matched_weight = self.kb.matched_weights(fired)
+        for major, total in self.kb.total_weight_per_major.items():
+            score = matched_weight.get(major, 0.0) / total if total else 0.0
+            bucket = math.ceil(round(score * self.SCORE_BUCKETS, 9)) - 1
+            self.score_counts[major][min(self.SCORE_BUCKETS - 1, max(0, bucket))] += 1
+            self.score_sums[major] += score
+
+    def dead_rules(self) -> List[str]:
+        return [rule.name for rule, fires in zip(self.kb.rules, self.fires) if fires == 0]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "students": self.students,
+            "rules": [
+                {
+                    "name": rule.name,
+                    "major": rule.major,
+                    "evaluations": self.evaluations[i],
+                    "fires": self.fires[i],
+                    "fire_rate": self.fires[i] / self.evaluations[i] if self.evaluations[i] else 0.0,
+                    "seconds": self.seconds[i],
+                }
+                for i, rule in enumerate(self.kb.rules)
+            ],
+            "majors": {
+                major: {
+                    "mean_score": self.score_sums[major] / self.students if self.students else 0.0,
+                    "buckets": [
+                        {"le": round((b + 1) / self.SCORE_BUCKETS, 2), "count": count}
+                        for b, count in enumerate(counts)
+                    ],
+                }
+                for major, counts in self.score_counts.items()
+            },
+        }
+
+    def to_json(self) -> str:
+        import json
+
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = "expert_system") -> str:
+        lines = [
+            f"# HELP {prefix}_students_total Jumlah siswa yang dievaluasi.",
+            f"# TYPE {prefix}_students_total counter",
+            f"{prefix}_students_total {self.students}",
+        ]
+        for metric, help_text, values in (
+            ("rule_evaluations_total", "Jumlah evaluasi rule.", self.evaluations),
+            ("rule_fires_total", "Jumlah rule terpenuhi.", self.fires),
+            ("rule_eval_seconds_total", "Total waktu evaluasi rule dalam detik.", self.seconds),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for rule, value in zip(self.kb.rules, values):
+                labels = f'rule="{_prometheus_label(rule.name)}",major="{_prometheus_label(rule.major)}"'
+                lines.append(f"{prefix}_{metric}{{{labels}}} {value}")
+        lines.append(f"# HELP {prefix}_major_score Distribusi skor per jurusan.")
+        lines.append(f"# TYPE {prefix}_major_score histogram")
+        for major, counts in self.score_counts.items():
+            label = _prometheus_label(major)
+            cumulative = 0
+            for b, count in enumerate(counts):
+                cumulative += count
+                le = round((b + 1) / self.SCORE_BUCKETS, 2)
+                lines.append(f'{prefix}_major_score_bucket{{major="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_major_score_bucket{{major="{label}",le="+Inf"}} {self.students}')
+            lines.append(f'{prefix}_major_score_sum{{major="{label}"}} {self.score_sums[major]}')
+            lines.append(f'{prefix}_major_score_count{{major="{label}"}} {self.students}')
+        return "\n".join(lines) + "\n"
+
+
+class ProfiledInferenceEngine(InferenceEngine):
+    columnar = False
+
+    def __init__(self, kb: KnowledgeBase, profiler: Optional[RuleProfiler] = None) -> None:
+        super().__init__(kb)
+        self.profiler = profiler or RuleProfiler(kb)
+
+    def infer_compact(self, facts: Dict[str, object]) -> int:
+        profiler = self.profiler
+        if profiler.version != self.kb.version:
+            profiler.reset()
+        facts = self.kb.derive_facts(facts)
+        predicates = self.kb.predicates
+        results: List[Optional[bool]] = [None] * len(predicates)
+        evaluations, fires, seconds = profiler.evaluations, profiler.fires, profiler.seconds
+        clock = time.perf_counter
+        fired = 0
+        for i, clause_ids in enumerate(self.kb.rule_clauses):
+            started = clock()
+            matched = True
+            for idx in clause_ids:
+                value = results[idx]
+                if value is None:
+                    value = results[idx] = predicates[idx](facts)
+                if not value:
+                    matched = False
+                    break
+            seconds[i] += clock() - started
+            evaluations[i] += 1
+            if matched:
+                fires[i] += 1
+                fired |= 1 << i
+        profiler.observe_scores(fired)
+        return fired
+
+
+class StudentBatch(_Record):
+    __slots__ = (
+        "size",
+        "grades",
+        "interests",
+        "interest_codes",
+        "environments",
+        "environment_codes",
+        "career_keywords",
+    )
+
+    def __init__(
+        self,
+        size: int,
+        grades: Dict[str, array],
+        interests: array,
+        interest_codes: Dict[str, int],
+        environments: array,
+        environment_codes: Dict[str, int],
+        career_keywords: List[FrozenSet[str]],
+    ) -> None:
+        self.size = size
+        self.grades = grades
+        self.interests = interests
+        self.interest_codes = interest_codes
+        self.environments = environments
+        self.environment_codes = environment_codes
+        self.career_keywords = career_keywords
+
+    @classmethod
+    def from_facts(cls, facts_list: Sequence[Dict[str, object]], kb: KnowledgeBase) -> "StudentBatch":
+        subjects = sorted({clause[1] for clause in kb.clauses if clause[0] == "grade"})
+        grades = {subject: array("d", (f[subject] for f in facts_list)) for subject in subjects}
+        interest_codes: Dict[str, int] = {}
+        environment_codes: Dict[str, int] = {}
+        interests = array("L")
+        environments = array("L")
+        for f in facts_list:
+            bits = 0
+            for name in f["interests"]:
+                bits |= interest_codes.setdefault(name, 1 << len(interest_codes))
+            interests.append(bits)
+            environments.append(environment_codes.setdefault(f["environment"], len(environment_codes)))
+        return cls(
+            size=len(facts_list),
+            grades=grades,
+            interests=interests,
+            interest_codes=interest_codes,
+            environments=environments,
+            environment_codes=environment_codes,
+            career_keywords=[kb.derive_facts(f)["career_keywords"] for f in facts_list],
+        )
+
+
+class BatchInferenceEngine:
+    def __init__(self, kb: KnowledgeBase) -> None:
+        self.kb = kb
+
+    def _clause_mask(self, clause: Clause, batch: StudentBatch) -> int:
+        kind = clause[0]
+        if kind == "interests":
+            wanted = 0
+            for name in clause[1]:
+                wanted |= batch.interest_codes.get(name, 0)
+            return _mask_from_flags([bits & wanted for bits in batch.interests]) if wanted else 0
+        if kind == "grade":
+            threshold = clause[2]
+            return _mask_from_flags([value >= threshold for value in batch.grades[clause[1]]])
+        if kind == "environment":
+            codes = {batch.environment_codes[env] for env in clause[1] if env in batch.environment_codes}
+            return _mask_from_flags([code in codes for code in batch.environments]) if codes else 0
+        if kind == "career":
+            keywords = frozenset(clause[1])
+            return _mask_from_flags([not keywords.isdisjoint(found) for found in batch.career_keywords])
+        raise ValueError(f"Jenis klausa tidak dikenal: {kind!r}")
+
+    def rule_masks(self, batch: StudentBatch) -> List[int]:
+        everyone = (1 << batch.size) - 1
+        clause_masks = [self._clause_mask(clause, batch) for clause in self.kb.clauses]
+        masks: List[int] = []
+        for clause_ids in self.kb.rule_clauses:
+            mask = everyone
+            for idx in clause_ids:
+                mask &= clause_masks[idx]
+                if not mask:
+                    break
+            masks.append(mask)
+        return masks
+
+    def infer_batch(self, batch: StudentBatch) -> List[int]:
+        fired = [0] * batch.size
+        for i, mask in enumerate(self.rule_masks(batch)):
+            if mask:
+                bit = 1 << i
+                for student in _set_bits(mask):
+                    fired[student] |= bit
+        return fired
+
+
+def facts_key(facts: Dict[str, object]) -> Tuple[Tuple[str, object], ...]:
+    return tuple(
+        sorted(
+            (name, frozenset(value) if isinstance(value, (set, list, tuple, frozenset)) else value)
+            for name, value in facts.items()
+        )
+    )
+
+
+def _copy_recommendations(recommendations: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    copies: List[Dict[str, object]] = []
+    for recommendation in recommendations:
+        copy = dict(recommendation)
+        if "details" in copy:
+            copy["details"] = [FiredRule(fired.rule, fired.explanation) for fired in copy["details"]]
+        copies.append(copy)
+    return copies
+
+
+class RecommendationCache:
+    def __init__(self, maxsize: int = 10_000) -> None:
+        if maxsize <= 0:
+            raise ValueError("Ukuran cache harus lebih dari 0.")
+        self.maxsize = maxsize
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[object, ...], List[Dict[str, object]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def validate(self, version: int) -> None:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key: Tuple[object, ...]) -> Optional[List[Dict[str, object]]]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Tuple[object, ...], value: List[Dict[str, object]]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class Recommender:
+    def __init__(
+        self,
+        kb: KnowledgeBase,
+        engine: InferenceEngine,
+        cache: Optional[RecommendationCache] = None,
+    ) -> None:
+        self.kb = kb
+        self.engine = engine
+        self.batch_engine = BatchInferenceEngine(kb)
+        self.cache = cache
+
+    def recommend(
+        self, facts: Dict[str, object], top_n: int = 3, explain: bool = True
+    ) -> List[Dict[str, object]]:
+        if self.cache is None:
+            return self.rank(self.engine.infer_compact(facts), top_n, explain)
+        self.cache.validate(self.kb.version)
+        key = (top_n, explain, facts_key(facts))
+        recommendations = self.cache.get(key)
+        if recommendations is None:
+            recommendations = self.rank(self.engine.infer_compact(facts), top_n, explain)
+            self.cache.put(key, recommendations)
+        return _copy_recommendations(recommendations)
+
+    def recommend_batch(
+        self, facts_list: Sequence[Dict[str, object]], top_n: int = 3, explain: bool = True
+    ) -> List[List[Dict[str, object]]]:
+        return [self.rank(fired, top_n, explain) for fired in self.infer_batch(facts_list)]
+
+    def infer_batch(self, facts_list: Sequence[Dict[str, object]]) -> List[int]:
+        if not facts_list:
+            return []
+        if not self.engine.columnar:
+            return [self.engine.infer_compact(facts) for facts in facts_list]
+        return self.batch_engine.infer_batch(StudentBatch.from_facts(facts_list, self.kb))
+
+    def rank(self, fired: int, top_n: int = 3, explain: bool = True) -> List[Dict[str, object]]:
+        return self.rank_weights(fired, self.kb.matched_weights(fired), top_n, explain)
+
+    def rank_weights(
+        self, fired: int, matched_weight: Dict[str, float], top_n: int = 3, explain: bool = True
+    ) -> List[Dict[str, object]]:
+        totals = self.kb.total_weight_per_major
+        major_order = self.kb.major_order
+        candidates = [
+            (round(weight / totals[major], 3), weight, -major_order[major], major)
+            for major, weight in matched_weight.items()
+            if weight != 0 and totals[major] != 0
+        ]
+        top = heapq.nlargest(top_n, candidates) if top_n > 0 else []
+
+        recommendations: List[Dict[str, object]] = []
+        for score, weight, _, major in top:
+            recommendation: Dict[str, object] = {
+                "major": major,
+                "score": score,
+                "fired": fired & self.kb.major_masks[major],
+                "matched_weight": weight,
+                "total_weight": totals[major],
+            }
+            if explain:
+                recommendation["details"] = self.kb.explain(recommendation["fired"])
+            recommendations.append(recommendation)
+        return recommendations
+
+    def explain(self, recommendation: Dict[str, object]) -> List[FiredRule]:
+        if "details" in recommendation:
+            return recommendation["details"]
+        return self.kb.explain(recommendation["fired"])
+
+
+class RecommendationSession:
+    def __init__(self, recommender: Recommender, facts: Dict[str, object], top_n: int = 3) -> None:
+        self.recommender = recommender
+        self.top_n = top_n
+        self.facts = dict(facts)
+        self.evaluated_rules = 0
+        self._rescore()
+
+    def _rescore(self) -> None:
+        kb = self.recommender.kb
+        self.version = kb.version
+        self.fired = self.recommender.engine.infer_compact(self.facts)
+        self.matched_weight = kb.matched_weights(self.fired)
+        self.evaluated_rules = len(kb.rules)
+
+    def update(self, **changes: object) -> List[Dict[str, object]]:
+        kb = self.recommender.kb
+        self.facts.update(changes)
+        if self.version != kb.version:
+            self._rescore()
+            return self.recommendations()
+
+        affected = 0
+        for name in changes:
+            affected |= kb.rules_by_fact.get(name, 0)
+        self.evaluated_rules = bin(affected).count("1")
+        if not affected:
+            return self.recommendations()
+
+        fired = (self.fired & ~affected) | self.recommender.engine.infer_subset(self.facts, affected)
+        changed = fired ^ self.fired
+        self.fired = fired
+        touched = {kb.rules[i].major for i in _set_bits(changed)}
+        for major in touched:
+            weight = kb.matched_weights(fired & kb.major_masks[major]).get(major)
+            if weight is None:
+                self.matched_weight.pop(major, None)
+            else:
+                self.matched_weight[major] = weight
+        return self.recommendations()
+
+    def recommendations(self, explain: bool = True) -> List[Dict[str, object]]:
+        return self.recommender.rank_weights(self.fired, self.matched_weight, self.top_n, explain)
+
+
+class MultiTenantRecommender:
+    def __init__(self, tenants: Dict[str, KnowledgeBase]) -> None:
+        self.tenants: Dict[str, KnowledgeBase] = dict(tenants)
+        self._build()
+
+    def _build(self) -> None:
+        self.recommenders = {name: Recommender(kb, InferenceEngine(kb)) for name, kb in self.tenants.items()}
+        self.slices: Dict[str, Tuple[int, int]] = {}
+        rules: List[Rule] = []
+        for name, kb in self.tenants.items():
+            self.slices[name] = (len(rules), (1 << len(kb.rules)) - 1)
+            rules.extend(kb.rules)
+        self.pool = KnowledgeBase(rules)
+        self.engine = InferenceEngine(self.pool)
+        self.batch_engine = BatchInferenceEngine(self.pool)
+        self._versions = {name: kb.version for name, kb in self.tenants.items()}
+
+    def add_tenant(self, name: str, kb: KnowledgeBase) -> None:
+        self.tenants[name] = kb
+        self._build()
+
+    def remove_tenant(self, name: str) -> None:
+        del self.tenants[name]
+        self._build()
+
+    def refresh(self) -> bool:
+        if all(kb.version == self._versions[name] for name, kb in self.tenants.items()):
+            return False
+        self._build()
+        return True
+
+    def _split(self, fired: int) -> Dict[str, int]:
+        return {name: (fired >> offset) & mask for name, (offset, mask) in self.slices.items()}
+
+    def infer_compact(self, facts: Dict[str, object]) -> Dict[str, int]:
+        self.refresh()
+        return self._split(self.engine.infer_compact(facts))
+
+    def recommend(
+        self, facts: Dict[str, object], top_n: int = 3, explain: bool = True
+    ) -> Dict[str, List[Dict[str, object]]]:
+        return {
+            name: self.recommenders[name].rank(fired, top_n, explain)
+            for name, fired in self.infer_compact(facts).items()
+        }
+
+    def recommend_batch(
+        self, facts_list: Sequence[Dict[str, object]], top_n: int = 3, explain: bool = True
+    ) -> List[Dict[str, List[Dict[str, object]]]]:
+        if not facts_list:
+            return []
+        self.refresh()
+        batch = StudentBatch.from_facts(facts_list, self.pool)
+        results: List[Dict[str, List[Dict[str, object]]]] = []
+        for fired in self.batch_engine.infer_batch(batch):
+            results.append(
+                {
+                    name: self.recommenders[name].rank(tenant_fired, top_n, explain)
+                    for name, tenant_fired in self._split(fired).items()
+                }
+            )
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tenants": len(self.tenants),
+            "rules": len(self.pool.rules),
+            "predicates": len(self.pool.predicates),
+            "tenant_predicates": sum(len(kb.predicates) for kb in self.tenants.values()),
+        }
+
+
+_default_knowledge_base: Optional[KnowledgeBase] = None
+
+
+def default_knowledge_base() -> KnowledgeBase:
+    global _default_knowledge_base
+    if _default_knowledge_base is None:
+        _default_knowledge_base = KnowledgeBase()
+        _default_knowledge_base.frozen = True
+    return _default_knowledge_base
+
+
+def build_recommender(
+    cache_size: int = 0, kb: Optional[KnowledgeBase] = None, profile: bool = False
+) -> Recommender:
+    kb = kb or default_knowledge_base()
+    engine = ProfiledInferenceEngine(kb) if profile else InferenceEngine(kb)
+    cache = RecommendationCache(cache_size) if cache_size else None
+    return Recommender(kb, engine, cache)
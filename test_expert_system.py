@@ -0,0 +1,957 @@
+from typing import Dict, Tuple
+import asyncio
+import codecs
+import contextlib
+import io
+import json
+import os
+import pickle
+import random
+import tempfile
+import time
+import unittest
+
+from expert_system import (
+    CHUNK_HEADER,
+    CHUNK_MAGIC,
+    CLI,
+    CohortStats,
+    ProfileIndex,
+    RecommendationService,
+    ReloadingRecommender,
+    ResultReader,
+    ResultWriter,
+    _open_stream,
+    _watch_rules,
+    aggregate_cohort,
+    expand_intervals,
+    load_knowledge_base,
+    load_rule_file,
+    merge_cohorts,
+    parallel_recommend,
+    read_records,
+    record_to_facts,
+    recommend_stream,
+    run_batch,
+    run_batch_job,
+    run_batch_columnar,
+    save_rule_file,
+    sensitivity_sweep,
+    validate_records,
+)
+from recommender_core import (
+    GRADE_FIELDS,
+    IndexedInferenceEngine,
+    InferenceEngine,
+    KeywordIndex,
+    KnowledgeBase,
+    MultiTenantRecommender,
+    RecommendationSession,
+    Rule,
+    build_recommender,
+    default_knowledge_base,
+)
+
+
+class RecommendationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.recommender = build_recommender()
+
+    def test_stem_strength(self) -> None:
+        facts = {
+            "interests": {"Investigative", "Realistic"},
+            "math": 95,
+            "physics": 92,
+            "biology": 80,
+            "chemistry": 90,
+            "language": 78,
+            "learning_style": "visual",
+            "environment": "riset",
+            "career_goal": "insinyur robotik",
+        }
+        recs = self.recommender.recommend(facts)
+        majors = [r["major"] for r in recs]
+        self.assertIn("Teknik Elektro", majors)
+        self.assertIn("Teknik Informatika", majors)
+        self.assertIn("Statistika", majors)
+        self.assertEqual(recs[0]["major"], "Teknik Elektro")
+
+    def test_medical_strength(self) -> None:
+        facts = {
+            "interests": {"Social", "Investigative"},
+            "math": 75,
+            "physics": 70,
+            "biology": 95,
+            "chemistry": 92,
+            "language": 80,
+            "learning_style": "auditori",
+            "environment": "riset",
+            "career_goal": "dokter spesialis",
+        }
+        recs = self.recommender.recommend(facts)
+        self.assertGreater(len(recs), 0)
+        self.assertEqual(recs[0]["major"], "Kedokteran")
+
+    def test_art_design_strength(self) -> None:
+        facts = {
+            "interests": {"Artistic", "Enterprising"},
+            "math": 70,
+            "physics": 60,
+            "biology": 65,
+            "chemistry": 60,
+            "language": 85,
+            "learning_style": "visual",
+            "environment": "kreatif",
+            "career_goal": "desainer grafis",
+        }
+        recs = self.recommender.recommend(facts)
+        self.assertGreater(len(recs), 0)
+        self.assertEqual(recs[0]["major"], "Desain Komunikasi Visual")
+
+    def test_compiled_rules_share_predicates(self) -> None:
+        kb = self.recommender.kb
+        clause_count = sum(len(ids) for ids in kb.rule_clauses)
+        self.assertLess(len(kb.predicates), clause_count)
+        facts = {
+            "interests": {"Investigative", "Social"},
+            "math": 88,
+            "physics": 70,
+            "biology": 85,
+            "chemistry": 80,
+            "language": 78,
+            "learning_style": "visual",
+            "environment": "industri",
+            "career_goal": "analis data kesehatan",
+        }
+        expected = [rule.name for rule in kb.rules if rule.condition(facts)[0]]
+        fired = [f.rule.name for f in self.recommender.engine.infer(facts)]
+        self.assertEqual(fired, expected)
+
+    def test_columnar_batch_matches_scalar(self) -> None:
+        rng = random.Random(3)
+        interests = sorted(CLI.VALID_INTERESTS)
+        goals = ["developer data", "dokter", "analis bisnis", "desainer grafis", "akuntan", "guru", ""]
+        facts_list = [
+            {
+                "interests": set(rng.sample(interests, rng.randint(1, 3))),
+                **{subject: float(rng.choice([60, 75, 78, 80, 85, 88, 95])) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(goals),
+            }
+            for _ in range(300)
+        ]
+        batch = self.recommender.recommend_batch(facts_list, top_n=5)
+        scalar = [self.recommender.recommend(facts, top_n=5) for facts in facts_list]
+        self.assertEqual(batch, scalar)
+
+    def test_indexed_engine_matches_scan(self) -> None:
+        kb = self.recommender.kb
+        scan = InferenceEngine(kb)
+        indexed = IndexedInferenceEngine(kb)
+        rng = random.Random(5)
+        interests = sorted(CLI.VALID_INTERESTS)
+        for _ in range(300):
+            facts = {
+                "interests": set(rng.sample(interests, rng.randint(1, 3))),
+                **{subject: float(rng.randint(60, 100)) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(["dokter", "data analyst", "konselor", "pilot", "desain bisnis"]),
+            }
+            self.assertEqual(indexed.infer(facts), scan.infer(facts))
+
+    def test_recommendation_cache(self) -> None:
+        recommender = build_recommender(cache_size=2, kb=KnowledgeBase())
+        base = {
+            "interests": {"Social", "Investigative"},
+            "math": 75,
+            "physics": 70,
+            "biology": 95,
+            "chemistry": 92,
+            "language": 80,
+            "learning_style": "auditori",
+            "environment": "riset",
+            "career_goal": "dokter spesialis",
+        }
+        first = recommender.recommend(base)
+        again = recommender.recommend({**base, "interests": ["Investigative", "Social"]})
+        self.assertEqual(first, again)
+        again[0]["score"] = -1
+        again[0]["details"].clear()
+        again.pop()
+        self.assertEqual(recommender.recommend(base), first)
+        recommender.recommend({**base, "math": 90})
+        recommender.recommend({**base, "math": 91})
+        self.assertEqual(recommender.cache.stats()["evictions"], 1)
+        self.assertEqual((recommender.cache.hits, recommender.cache.misses), (2, 3))
+
+        kb = recommender.kb
+        kb.set_rules([rule for rule in kb.rules if rule.major != "Kedokteran"])
+        self.assertNotIn("Kedokteran", [r["major"] for r in recommender.recommend(base)])
+        self.assertEqual(len(recommender.cache), 1)
+
+    def test_partial_top_n_matches_full_ranking(self) -> None:
+        facts = {
+            "interests": {"Investigative", "Realistic", "Conventional"},
+            "math": 90,
+            "physics": 85,
+            "biology": 80,
+            "chemistry": 86,
+            "language": 80,
+            "learning_style": "visual",
+            "environment": "industri",
+            "career_goal": "data analyst",
+        }
+        fired = self.recommender.engine.infer_compact(facts)
+        full = self.recommender.rank(fired, top_n=len(self.recommender.kb.total_weight_per_major))
+        for top_n in (0, 1, 3, 5):
+            self.assertEqual(self.recommender.rank(fired, top_n=top_n), full[:top_n])
+
+    def test_compact_results_explain_lazily(self) -> None:
+        facts = {
+            "interests": {"Artistic", "Enterprising"},
+            "math": 70,
+            "physics": 60,
+            "biology": 65,
+            "chemistry": 60,
+            "language": 85,
+            "learning_style": "visual",
+            "environment": "kreatif",
+            "career_goal": "desainer grafis",
+        }
+        compact = self.recommender.recommend(facts, explain=False)
+        full = self.recommender.recommend(facts)
+        self.assertNotIn("details", compact[0])
+        self.assertEqual([self.recommender.explain(rec) for rec in compact], [rec["details"] for rec in full])
+        self.assertEqual(
+            [fired.rule.name for fired in self.recommender.explain(compact[0])], ["DKV-Art", "DKV-Career"]
+        )
+        self.assertFalse(hasattr(full[0]["details"][0], "__dict__"))
+
+    def test_parallel_scoring_keeps_input_order(self) -> None:
+        facts_list = [
+            {
+                "interests": {"Investigative"},
+                "math": float(60 + i % 40),
+                "physics": 80.0,
+                "biology": float(70 + i % 30),
+                "chemistry": 86.0,
+                "language": 78.0,
+                "learning_style": "visual",
+                "environment": ("riset", "industri", "kreatif")[i % 3],
+                "career_goal": ("data", "dokter", "apoteker")[i % 3],
+            }
+            for i in range(200)
+        ]
+        parallel = list(parallel_recommend(iter(facts_list), workers=2, chunk_size=16))
+        self.assertEqual(parallel, self.recommender.recommend_batch(facts_list, explain=False))
+
+        records = "".join(
+            json.dumps({**facts, "id": i, "interests": sorted(facts["interests"])}) + "\n"
+            for i, facts in enumerate(facts_list)
+        )
+        sequential, pooled = io.StringIO(), io.StringIO()
+        run_batch(self.recommender, io.StringIO(records), sequential, "jsonl", chunk_size=16)
+        run_batch(self.recommender, io.StringIO(records), pooled, "jsonl", chunk_size=16, workers=2)
+        self.assertEqual(pooled.getvalue(), sequential.getvalue())
+
+    def test_http_service_round_trip(self) -> None:
+        async def post(port: int, payload: object) -> Tuple[int, Dict[str, object]]:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps(payload).encode("utf-8")
+            writer.write(
+                b"POST /recommend HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+                + body
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, data = response.partition(b"\r\n\r\n")
+            return int(head.split()[1]), json.loads(data)
+
+        student = {
+            "id": "s1",
+            "interests": ["Social", "Investigative"],
+            "math": 75,
+            "physics": 70,
+            "biology": 95,
+            "chemistry": 92,
+            "language": 80,
+            "learning_style": "auditori",
+            "environment": "riset",
+            "career_goal": "dokter spesialis",
+        }
+
+        async def scenario() -> None:
+            service = RecommendationService(self.recommender, max_pending=4)
+            server = await service.start("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                status, single = await post(port, {"facts": student, "top_n": 1, "explain": True})
+                self.assertEqual(status, 200)
+                self.assertEqual(single["recommendations"][0]["major"], "Kedokteran")
+                self.assertIn("explanations", single["recommendations"][0])
+
+                anonymous = {key: value for key, value in student.items() if key != "id"}
+                status, batch = await post(
+                    port, {"students": [student, {**student, "math": "abc"}, anonymous, ["bukan", "objek"]]}
+                )
+                self.assertEqual(status, 200)
+                self.assertIn("recommendations", batch["results"][0])
+                self.assertIn("error", batch["results"][1])
+                self.assertEqual([row["id"] for row in batch["results"]], ["s1", "s1", 3, 4])
+                _, errors = validate_records([["bukan", "objek"]], start=4)
+                self.assertEqual(batch["results"][3]["error"], errors[0][2])
+
+                self.assertEqual((await post(port, {"unknown": 1}))[0], 400)
+                self.assertEqual((await post(port, {"facts": student, "top_n": float("inf")}))[0], 400)
+                service.recommender = None
+                with contextlib.redirect_stderr(io.StringIO()):
+                    status, body = await post(port, {"facts": student})
+                self.assertEqual(status, 500)
+                self.assertIn("error", body)
+                service.recommender = self.recommender
+                service.max_pending = 0
+                self.assertEqual((await post(port, {"facts": student}))[0], 503)
+
+        asyncio.run(scenario())
+
+    def test_rule_file_snapshot_and_reload(self) -> None:
+        facts = {
+            "interests": {"Social", "Investigative"},
+            "math": 75,
+            "physics": 70,
+            "biology": 95,
+            "chemistry": 92,
+            "language": 80,
+            "learning_style": "auditori",
+            "environment": "riset",
+            "career_goal": "dokter spesialis",
+        }
+        expected = self.recommender.recommend(facts, top_n=10)
+        with tempfile.TemporaryDirectory() as tmp:
+            rule_path = os.path.join(tmp, "rules.json")
+            snapshot_path = os.path.join(tmp, "rules.pkl")
+            save_rule_file(self.recommender.kb.rules, rule_path)
+            from_file = build_recommender(kb=load_knowledge_base(rule_path))
+            self.assertEqual(from_file.recommend(facts, top_n=10), expected)
+
+            KnowledgeBase(load_rule_file(rule_path)).save_snapshot(snapshot_path)
+            snapshot = load_knowledge_base(snapshot_path)
+            self.assertEqual(snapshot.total_weight_per_major, self.recommender.kb.total_weight_per_major)
+            self.assertEqual(build_recommender(kb=snapshot).recommend(facts, top_n=10), expected)
+
+            reloading = ReloadingRecommender(rule_path)
+            before = reloading.current
+            self.assertFalse(reloading.maybe_reload())
+            kept = [rule for rule in self.recommender.kb.rules if rule.major != "Kedokteran"]
+            save_rule_file(kept, rule_path)
+            os.utime(rule_path, ns=(time.time_ns(), time.time_ns() + 10**9))
+            self.assertTrue(reloading.maybe_reload())
+            self.assertIsNot(reloading.current, before)
+            self.assertEqual(before.recommend(facts)[0]["major"], "Kedokteran")
+            self.assertNotIn("Kedokteran", [r["major"] for r in reloading.recommend(facts, top_n=10)])
+
+            with open(rule_path, "w", encoding="utf-8") as handle:
+                json.dump({"rules": [{"name": "X", "major": "Y", "weight": -1, "explanation": "z"}]}, handle)
+            with self.assertRaises(ValueError):
+                load_rule_file(rule_path)
+            with open(rule_path, "w", encoding="utf-8") as handle:
+                handle.write('{"rules": [{"name": "X", "major": "Y", "weight": NaN, "explanation": "z"}]}')
+            with self.assertRaises(ValueError):
+                load_rule_file(rule_path)
+            yaml_path = os.path.join(tmp, "rules.yaml")
+            with open(yaml_path, "w", encoding="utf-8") as handle:
+                handle.write("rules: [\n  - name: {")
+            with self.assertRaises(ValueError):
+                load_rule_file(yaml_path)
+
+            with open(snapshot_path, "rb") as handle:
+                data = handle.read()
+            with open(snapshot_path, "wb") as handle:
+                handle.write(data[: len(data) // 2])
+            with self.assertRaises(ValueError):
+                load_knowledge_base(snapshot_path)
+            with open(snapshot_path, "wb") as handle:
+                pickle.dump({"format": "expert-system-kb/1", "rules": []}, handle)
+            with self.assertRaises(ValueError):
+                load_knowledge_base(snapshot_path)
+
+            async def watch_once() -> None:
+                self.recommender.kb.save_snapshot(snapshot_path)
+                watcher = asyncio.ensure_future(_watch_rules(ReloadingRecommender(snapshot_path), 0.01))
+                with open(snapshot_path, "wb") as handle:
+                    handle.write(data[: len(data) // 2])
+                os.utime(snapshot_path, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+                await asyncio.sleep(0.1)
+                self.assertFalse(watcher.done())
+                watcher.cancel()
+
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                asyncio.run(watch_once())
+            self.assertIn("Gagal memuat ulang rule", errors.getvalue())
+
+    def test_rule_profiler_counts_and_exports(self) -> None:
+        recommender = build_recommender(profile=True)
+        profiler = recommender.engine.profiler
+        facts = {
+            "interests": {"Artistic", "Enterprising"},
+            "math": 70,
+            "physics": 60,
+            "biology": 65,
+            "chemistry": 60,
+            "language": 85,
+            "learning_style": "visual",
+            "environment": "kreatif",
+            "career_goal": "desainer grafis",
+        }
+        self.assertEqual(recommender.recommend(facts), self.recommender.recommend(facts))
+        recommender.recommend_batch([facts, facts])
+        names = [rule.name for rule in recommender.kb.rules]
+        dkv = names.index("DKV-Art")
+        self.assertEqual(profiler.students, 3)
+        self.assertEqual(profiler.evaluations[dkv], 3)
+        self.assertEqual(profiler.fires[dkv], 3)
+        self.assertIn("Kedokteran-Bio", profiler.dead_rules())
+        self.assertEqual(profiler.score_counts["Desain Komunikasi Visual"][-1], 3)
+
+        report = json.loads(profiler.to_json())
+        self.assertEqual(report["rules"][dkv]["fire_rate"], 1.0)
+        metrics = profiler.to_prometheus()
+        self.assertIn('expert_system_rule_fires_total{rule="DKV-Art",major="Desain Komunikasi Visual"} 3', metrics)
+        self.assertIn('expert_system_major_score_bucket{major="Kedokteran",le="+Inf"} 3', metrics)
+        self.assertIn('expert_system_major_score_bucket{major="Desain Komunikasi Visual",le="1.0"} 3', metrics)
+        self.assertIn('expert_system_major_score_bucket{major="Desain Komunikasi Visual",le="0.9"} 0', metrics)
+        self.assertEqual([b["le"] for b in report["majors"]["Kedokteran"]["buckets"]][-1], 1.0)
+
+        kb = KnowledgeBase(
+            [
+                Rule(name="A", major="M", weight=0.4, explanation="a", interests={"Social"}),
+                Rule(name="B", major="M", weight=0.6, explanation="b", interests={"Artistic"}),
+            ]
+        )
+        edge = build_recommender(kb=kb, profile=True).engine.profiler
+        for fired in (0b01, 0b11, 0b00):
+            edge.observe_scores(fired)
+        self.assertEqual(edge.score_counts["M"], [1, 0, 0, 1, 0, 0, 0, 0, 0, 1])
+        self.assertIn('expert_system_major_score_bucket{major="M",le="0.4"} 2', edge.to_prometheus())
+
+    def test_optimized_evaluation_order(self) -> None:
+        rng = random.Random(11)
+        interests = sorted(CLI.VALID_INTERESTS)
+
+        def profile() -> Dict[str, object]:
+            return {
+                "interests": set(rng.sample(interests, rng.randint(1, 2))),
+                **{subject: float(rng.randint(50, 100)) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(["dokter", "guru", "analis data", ""]),
+            }
+
+        kb = self.recommender.kb
+        engine = InferenceEngine(kb)
+        stats = engine.optimize([profile() for _ in range(300)])
+        self.assertEqual(sorted(i for i, _ in engine.plan), list(range(len(kb.rules))))
+        costs = [stats.rejection_cost(ids[0]) for _, ids in engine.plan if ids]
+        self.assertEqual(costs, sorted(costs))
+        for _, ids in engine.plan:
+            self.assertEqual(list(ids), sorted(ids, key=lambda idx: (stats.rejection_cost(idx), idx)))
+
+        indexed = IndexedInferenceEngine(kb)
+        indexed.optimize(stats=stats)
+        plan = dict(engine.plan)
+        for i, residual in enumerate(indexed._residual):
+            self.assertEqual(list(residual), [idx for idx in plan[i] if idx in residual])
+
+        baseline = InferenceEngine(kb)
+        for _ in range(300):
+            facts = profile()
+            self.assertEqual(engine.infer_compact(facts), baseline.infer_compact(facts))
+            self.assertEqual(indexed.infer_compact(facts), baseline.infer_compact(facts))
+
+    def test_incremental_session_matches_fresh_scoring(self) -> None:
+        facts = {
+            "interests": {"Investigative", "Realistic"},
+            "math": 70,
+            "physics": 92,
+            "biology": 80,
+            "chemistry": 90,
+            "language": 78,
+            "learning_style": "visual",
+            "environment": "riset",
+            "career_goal": "insinyur robotik",
+        }
+        session = RecommendationSession(self.recommender, facts)
+        self.assertEqual(session.recommendations(), self.recommender.recommend(facts))
+        kb = self.recommender.kb
+        for changes in (
+            {"math": 95},
+            {"environment": "industri"},
+            {"career_goal": "dokter"},
+            {"interests": {"Social"}},
+            {"biology": 90, "chemistry": 85},
+            {"learning_style": "kinestetik"},
+        ):
+            facts.update(changes)
+            self.assertEqual(session.update(**changes), self.recommender.recommend(facts))
+            expected = 0
+            for name in changes:
+                expected |= kb.rules_by_fact.get(name, 0)
+            self.assertEqual(session.evaluated_rules, bin(expected).count("1"))
+        self.assertEqual(session.evaluated_rules, 0)
+
+    def test_columnar_result_store(self) -> None:
+        rng = random.Random(7)
+        interests = sorted(CLI.VALID_INTERESTS)
+        records = [
+            {
+                "id": f"s{i}",
+                "interests": rng.sample(interests, 2),
+                **{subject: rng.randint(60, 100) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(["dokter", "data", "guru"]),
+            }
+            for i in range(150)
+        ]
+        records.append({"id": "bad", "interests": "Astronaut"})
+        first = io.StringIO("".join(json.dumps(r) + "\n" for r in records[:100]))
+        second = io.StringIO("".join(json.dumps(r) + "\n" for r in records[100:]))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cohort.esr")
+            run_batch_columnar(self.recommender, first, path, "jsonl", chunk_size=16)
+            with open(path, "ab") as handle:
+                handle.write(CHUNK_HEADER.pack(CHUNK_MAGIC, 64, 1, 4096) + b"\x00" * 100)
+            processed, failed = run_batch_columnar(
+                self.recommender, second, path, "jsonl", chunk_size=16, compress=False
+            )
+            self.assertEqual((processed, failed), (50, 1))
+            with ResultReader(path) as reader:
+                rows = list(reader)
+                self.assertEqual(len(reader), 150)
+                expected_top: Dict[str, int] = {}
+                for record, (student_id, ranked, fired) in zip(records, rows):
+                    recs = self.recommender.recommend(record_to_facts(record), explain=False)
+                    self.assertEqual(student_id, record["id"])
+                    self.assertEqual(ranked, [(r["major"], r["score"]) for r in recs])
+                    self.assertEqual(fired, self.recommender.engine.infer_compact(record_to_facts(record)))
+                    if recs:
+                        expected_top[recs[0]["major"]] = expected_top.get(recs[0]["major"], 0) + 1
+                self.assertEqual(reader.top_major_counts(), expected_top)
+                self.assertEqual(reader.count_top_major("Kedokteran"), expected_top.get("Kedokteran", 0))
+            with self.assertRaises(ValueError):
+                ResultWriter(path, self.recommender.kb, top_n=5)
+
+    def test_sensitivity_sweep_matches_grid(self) -> None:
+        base = {
+            "interests": {"Investigative"},
+            "math": 80,
+            "physics": 85,
+            "biology": 82,
+            "chemistry": 88,
+            "language": 79,
+            "learning_style": "visual",
+            "environment": "riset",
+            "career_goal": "analis data",
+        }
+        rows = list(
+            sensitivity_sweep(
+                self.recommender,
+                base,
+                subjects=["math", "biology"],
+                interest_sets=[{"Investigative"}, {"Social", "Conventional"}],
+            )
+        )
+        self.assertEqual(len(rows), 2 * 3 * 2)
+        for row in rows:
+            table = expand_intervals(row["intervals"])
+            for grade in range(0, 101, 3):
+                facts = {
+                    **base,
+                    "interests": set(row["interests"]),
+                    "environment": row["environment"],
+                    row["subject"]: float(grade),
+                }
+                expected = [(r["major"], r["score"]) for r in self.recommender.recommend(facts)]
+                self.assertEqual(table[grade], expected)
+
+    def test_default_knowledge_base_is_shared(self) -> None:
+        self.assertIs(default_knowledge_base(), default_knowledge_base())
+        self.assertIs(build_recommender().kb, build_recommender().kb)
+        self.assertIsNot(build_recommender(kb=KnowledgeBase()).kb, default_knowledge_base())
+        shared = default_knowledge_base()
+        count = len(shared.rules)
+        with self.assertRaises(ValueError):
+            build_recommender().kb.set_rules(shared.rules[:2])
+        self.assertEqual(len(CLI().kb.rules), count)
+        own = build_recommender(kb=KnowledgeBase()).kb
+        own.set_rules(own.rules[:2])
+        self.assertEqual(len(own.rules), 2)
+
+    def test_core_import_is_lightweight(self) -> None:
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, recommender_core; "
+            "print(','.join(m for m in ('unittest', 'asyncio', 'multiprocessing', 'expert_system') if m in sys.modules))"
+        )
+        here = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        self.assertEqual(output, "")
+
+    def test_keyword_index_finds_overlapping_keywords(self) -> None:
+        index = KeywordIndex(["apotek", "apoteker", "data", "analis", "analitik", "riset pasar"])
+        self.assertEqual(index.find("apoteker dan analis data"), {"apotek", "apoteker", "analis", "data"})
+        self.assertEqual(index.find("analitik riset pasar"), {"analitik", "riset pasar"})
+        self.assertEqual(index.find("guru"), frozenset())
+        kb = self.recommender.kb
+        goal = "konsultan bisnis dan analyst system data"
+        expected = {k for k in kb.keyword_index.keywords if k in goal}
+        self.assertEqual(kb.keyword_index.find(goal), expected)
+
+    def test_batch_csv_and_jsonl(self) -> None:
+        csv_input = io.StringIO(
+            "id,interests,math,physics,biology,chemistry,language,learning_style,environment,career_goal\n"
+            's1,"Social,Investigative",75,70,95,92,80,auditori,riset,Dokter spesialis\n'
+            "s2,Astronaut,75,70,95,92,80,auditori,riset,dokter\n"
+        )
+        output = io.StringIO()
+        processed, failed = run_batch(self.recommender, csv_input, output, "csv", top_n=1)
+        self.assertEqual((processed, failed), (1, 1))
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(rows[0]["recommendations"][0]["major"], "Kedokteran")
+        self.assertEqual(rows[1]["id"], "s2")
+        self.assertIn("error", rows[1])
+
+        jsonl_input = io.StringIO(
+            json.dumps(
+                {
+                    "id": "s3",
+                    "interests": ["artistic", "enterprising"],
+                    "math": 70,
+                    "physics": 60,
+                    "biology": 65,
+                    "chemistry": 60,
+                    "language": 85,
+                    "learning_style": "visual",
+                    "environment": "kreatif",
+                    "career_goal": "desainer grafis",
+                }
+            )
+            + "\n"
+        )
+        output = io.StringIO()
+        run_batch(self.recommender, jsonl_input, output, "jsonl")
+        row = json.loads(output.getvalue())
+        self.assertEqual(row["recommendations"][0]["major"], "Desain Komunikasi Visual")
+
+        malformed = jsonl_input.getvalue() + '{"id": "rusak"\n[1, 2]\n' + jsonl_input.getvalue()
+        output = io.StringIO()
+        processed, failed = run_batch(self.recommender, io.StringIO(malformed), output, "jsonl")
+        self.assertEqual((processed, failed), (2, 2))
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([row["id"] for row in rows], ["s3", 2, 3, "s3"])
+        self.assertIn("JSON", rows[1]["error"])
+        self.assertIn("error", rows[2])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hasil.esr")
+            errors = []
+            counts = run_batch_columnar(
+                self.recommender, io.StringIO(malformed), path, "jsonl", error_sink=lambda *row: errors.append(row)
+            )
+            self.assertEqual(counts, (2, 2))
+            self.assertEqual([student_id for student_id, _ in errors], [2, 3])
+            csv_path = os.path.join(tmp, "siswa.csv")
+            with open(csv_path, "w", encoding="utf-8-sig", newline="") as handle:
+                handle.write(csv_input.getvalue())
+            stream = _open_stream(csv_path, "r")
+            try:
+                self.assertEqual(next(read_records(stream, "csv"))["id"], "s1")
+            finally:
+                stream.close()
+
+    def test_validation_stream_normalizes_and_sinks_errors(self) -> None:
+        good = {
+            "id": "a",
+            "interests": " social , INVESTIGATIVE",
+            "math": "75",
+            "physics": 70,
+            "biology": "95.5",
+            "chemistry": 92,
+            "language": 80,
+            "learning_style": " Auditori ",
+            "environment": "RISET",
+            "career_goal": "  Dokter Spesialis ",
+        }
+        facts = record_to_facts(good)
+        self.assertEqual(facts["interests"], {"Social", "Investigative"})
+        self.assertEqual((facts["math"], facts["biology"]), (75.0, 95.5))
+        self.assertEqual((facts["learning_style"], facts["environment"]), ("auditori", "riset"))
+        self.assertEqual(facts["career_goal"], "dokter spesialis")
+
+        async def source():
+            for index in range(7):
+                yield dict(good, id=f"s{index}")
+                yield dict(good, id=f"bad{index}", math="sembilan puluh")
+            yield ["bukan", "objek"]
+
+        errors = []
+
+        async def sink(student_id, record, error) -> None:
+            errors.append((student_id, error))
+
+        async def collect():
+            return [item async for item in recommend_stream(self.recommender, source(), sink, top_n=1, batch_size=3)]
+
+        results = asyncio.run(collect())
+        self.assertEqual([student_id for student_id, _ in results], [f"s{index}" for index in range(7)])
+        expected = self.recommender.recommend(facts, top_n=1, explain=False)
+        self.assertTrue(all(recs == expected for _, recs in results))
+        self.assertEqual([student_id for student_id, _ in errors], [f"bad{index}" for index in range(7)] + [15])
+        self.assertIn("math", errors[0][1])
+
+    def test_profile_index_matches_brute_force(self) -> None:
+        rng = random.Random(11)
+        goals = ["dokter", "software engineer", "desainer grafis", "analis data", "akuntan", "guru", ""]
+        profiles = [
+            {
+                "interests": set(rng.sample(sorted(CLI.VALID_INTERESTS), rng.randint(1, 2))),
+                **{subject: float(rng.randint(40, 100)) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(goals),
+            }
+            for _ in range(600)
+        ]
+        index = ProfileIndex(self.recommender.kb)
+        index.add_batch(self.recommender, ((f"s{i}", facts) for i, facts in enumerate(profiles)))
+        self.assertEqual(len(index), 600)
+
+        def distance(a, b) -> float:
+            (grades_a, mask_a), (grades_b, mask_b) = index.vector(a), index.vector(b)
+            return sum((x - y) ** 2 for x, y in zip(grades_a, grades_b)) + bin(mask_a ^ mask_b).count("1")
+
+        for query in profiles[:25]:
+            expected = sorted(range(len(profiles)), key=lambda i: (distance(query, profiles[i]), i))[:5]
+            found = index.nearest(query, k=5)
+            self.assertEqual([match.student_id for match in found], [f"s{i}" for i in expected])
+            self.assertEqual(found[0].distance, 0.0)
+        match = index.nearest(profiles[3], k=1)[0]
+        self.assertEqual(index.nearest(profiles[3], k=0), [])
+        expected_recs = self.recommender.recommend(profiles[3], top_n=3, explain=False)
+        self.assertEqual(match.recommendations, [(r["major"], r["score"]) for r in expected_recs])
+
+    def test_multi_tenant_shares_predicates(self) -> None:
+        base = KnowledgeBase()
+        reweighted = [
+            Rule(
+                rule.name,
+                rule.major,
+                rule.weight * 2,
+                rule.explanation,
+                rule.interests,
+                rule.min_grades,
+                rule.environments,
+                rule.career_keywords,
+            )
+            if rule.major == "Kedokteran"
+            else rule
+            for rule in base.rules
+        ]
+        tenant_b = KnowledgeBase(
+            reweighted[:20]
+            + [
+                Rule(
+                    name="Gizi-Bio",
+                    major="Ilmu Gizi",
+                    weight=0.4,
+                    interests={"Social"},
+                    min_grades={"biology": 80},
+                    career_keywords=("ahli gizi", "dokter"),
+                    explanation="Biologi dan minat sosial mendukung Ilmu Gizi.",
+                )
+            ]
+        )
+        tenants = MultiTenantRecommender({"a": base, "b": tenant_b})
+        stats = tenants.stats()
+        self.assertLess(stats["predicates"], stats["tenant_predicates"])
+
+        rng = random.Random(5)
+        goals = ["dokter", "ahli gizi", "software engineer", "analis data", ""]
+        profiles = [
+            {
+                "interests": set(rng.sample(sorted(CLI.VALID_INTERESTS), 2)),
+                **{subject: float(rng.randint(50, 100)) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(goals),
+            }
+            for _ in range(60)
+        ]
+        single = {name: build_recommender(kb=kb) for name, kb in tenants.tenants.items()}
+        batched = tenants.recommend_batch(profiles, top_n=3, explain=False)
+        for facts, batch_result in zip(profiles, batched):
+            expected = {name: r.recommend(facts, top_n=3, explain=False) for name, r in single.items()}
+            self.assertEqual(tenants.recommend(facts, explain=False), expected)
+            self.assertEqual(batch_result, expected)
+
+        tenant_b.set_rules(tenant_b.rules[-1:])
+        result = tenants.recommend(profiles[0], explain=False)
+        self.assertEqual(result["b"], build_recommender(kb=tenant_b).recommend(profiles[0], explain=False))
+
+    def test_cohort_aggregation_merges_partials(self) -> None:
+        rng = random.Random(8)
+        kb = self.recommender.kb
+        rows = []
+        for index in range(300):
+            facts = {
+                "interests": set(rng.sample(sorted(CLI.VALID_INTERESTS), 2)),
+                **{subject: float(rng.randint(40, 100)) for subject in GRADE_FIELDS},
+                "learning_style": "visual",
+                "environment": rng.choice(sorted(CLI.VALID_ENVIRONMENTS)),
+                "career_goal": rng.choice(["dokter", "software engineer", "analis data", "desainer", ""]),
+            }
+            fired = self.recommender.engine.infer_compact(facts)
+            rows.append((f"sekolah-{index % 3}", self.recommender.rank(fired, explain=False), fired))
+
+        whole = aggregate_cohort(kb, rows)
+        merged = merge_cohorts(aggregate_cohort(kb, rows[:120]), aggregate_cohort(kb, rows[120:]))
+        self.assertEqual({g: s.to_dict() for g, s in merged.items()}, {g: s.to_dict() for g, s in whole.items()})
+
+        stats = whole["sekolah-0"]
+        group_rows = [recs for group, recs, _ in rows if group == "sekolah-0"]
+        group_fired = [fired for group, _, fired in rows if group == "sekolah-0"]
+        self.assertEqual(stats.students, len(group_rows))
+        tops = [recs[0]["major"] for recs in group_rows if recs]
+        self.assertEqual(stats.top_majors, {major: tops.count(major) for major in set(tops)})
+        all_scores = [
+            {r["major"]: r["score"] for r in self.recommender.rank(fired, len(kb.major_order), explain=False)}
+            for fired in group_fired
+        ]
+        shown = [r["major"] for recs in group_rows for r in recs]
+        self.assertTrue(any(count > shown.count(major) for major, count in stats.major_counts.items()))
+        for major in stats.major_counts:
+            scores = sorted(student.get(major, 0.0) for student in all_scores)
+            self.assertEqual(stats.major_counts[major], sum(1 for score in scores if score))
+            self.assertAlmostEqual(stats.mean(major), sum(scores) / len(scores))
+            self.assertEqual(stats.quantile(major, 0.5), scores[(len(scores) + 1) // 2 - 1])
+            self.assertEqual(stats.quantile(major, 1.0), scores[-1])
+        rates = stats.fire_rates()
+        for i, rule in enumerate(kb.rules):
+            fires = sum(1 for fired in group_fired if fired >> i & 1)
+            self.assertAlmostEqual(rates[rule.name], fires / len(group_fired))
+        self.assertTrue(any(rate > 0 for name, rate in rates.items() if name.startswith("Farmasi")))
+        with self.assertRaises(ValueError):
+            stats.merge(CohortStats(KnowledgeBase(kb.rules[:3])))
+
+    def test_batch_job_resumes_and_reuses_results(self) -> None:
+        header = "id,interests,math,physics,biology,chemistry,language,learning_style,environment,career_goal\n"
+        rows = [
+            f's{i},"Social,Investigative",{60 + i % 40},70,95,92,80,auditori,riset,"Dokter\nspesialis"\n'
+            if i % 5 == 0
+            else f"s{i},Realistic,{i % 101},80,60,70,75,visual,industri,engineer\n"
+            for i in range(50)
+        ]
+        rows.insert(17, "bad,Astronaut,1,2,3,4,5,visual,riset,x\n")
+
+        class Crash(Exception):
+            pass
+
+        class CrashingRecommender:
+            def __init__(self, recommender, calls: int) -> None:
+                self.kb = recommender.kb
+                self.recommender = recommender
+                self.calls = calls
+
+            def recommend_batch(self, *args, **kwargs):
+                if not self.calls:
+                    raise Crash()
+                self.calls -= 1
+                return self.recommender.recommend_batch(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = os.path.join(tmp, "siswa.csv")
+            with open(input_path, "w", encoding="utf-8") as handle:
+                handle.write(header + "".join(rows))
+            clean, resumed = os.path.join(tmp, "clean.jsonl"), os.path.join(tmp, "resumed.jsonl")
+            self.assertEqual(run_batch_job(self.recommender, input_path, clean, "csv", chunk_size=8), (50, 1, 0))
+
+            with self.assertRaises(Crash):
+                run_batch_job(CrashingRecommender(self.recommender, 3), input_path, resumed, "csv", chunk_size=8)
+            with open(resumed, "ab") as handle:
+                handle.write(b'{"id": "partial')
+            self.assertEqual(run_batch_job(self.recommender, input_path, resumed, "csv", chunk_size=8), (50, 1, 0))
+            with open(clean, "rb") as a, open(resumed, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+            with open(clean, encoding="utf-8") as handle:
+                results = [json.loads(line) for line in handle]
+            self.assertEqual([r["id"] for r in results], [row.split(",")[0] for row in rows])
+            self.assertIn("error", results[17])
+            first = {
+                "interests": {"Social", "Investigative"},
+                "math": 60.0,
+                "physics": 70.0,
+                "biology": 95.0,
+                "chemistry": 92.0,
+                "language": 80.0,
+                "learning_style": "auditori",
+                "environment": "riset",
+                "career_goal": "dokter\nspesialis",
+            }
+            expected = self.recommender.recommend(first, explain=False)
+            expected = [{"major": r["major"], "score": r["score"]} for r in expected]
+            self.assertEqual(results[0]["recommendations"], expected)
+
+            rows[3] = rows[3].replace("Realistic", "Investigative")
+            with open(input_path, "w", encoding="utf-8") as handle:
+                handle.write(header + "".join(rows))
+            with self.assertRaises(ValueError):
+                run_batch_job(self.recommender, input_path, clean, "csv", chunk_size=8)
+            rerun = os.path.join(tmp, "rerun.jsonl")
+            counts = run_batch_job(self.recommender, input_path, rerun, "csv", chunk_size=8, previous=clean)
+            self.assertEqual(counts, (50, 1, 49))
+            interrupted = os.path.join(tmp, "interrupted.jsonl")
+            with self.assertRaises(Crash):
+                crashing = CrashingRecommender(self.recommender, 2)
+                run_batch_job(crashing, input_path, interrupted, "csv", chunk_size=8, previous=clean)
+            counts = run_batch_job(self.recommender, input_path, interrupted, "csv", chunk_size=8, previous=clean)
+            self.assertEqual(counts, (50, 1, 49))
+            with open(rerun, "rb") as a, open(interrupted, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+            shuffled = os.path.join(tmp, "shuffled.csv")
+            with open(shuffled, "w", encoding="utf-8") as handle:
+                handle.write(header + "".join(rows[1:] + rows[:1]))
+            reordered = os.path.join(tmp, "reordered.jsonl")
+            counts = run_batch_job(self.recommender, shuffled, reordered, "csv", previous=clean)
+            self.assertEqual(counts[:2], (50, 1))
+            with open(reordered, encoding="utf-8") as handle:
+                self.assertEqual(json.loads(handle.readline())["id"], "s1")
+            changed_kb = KnowledgeBase(self.recommender.kb.rules[:-1])
+            fresh = os.path.join(tmp, "fresh.jsonl")
+            counts = run_batch_job(build_recommender(kb=changed_kb), input_path, fresh, "csv", previous=clean)
+            self.assertEqual(counts, (50, 1, 0))
+            narrow = os.path.join(tmp, "narrow.jsonl")
+            counts = run_batch_job(self.recommender, input_path, narrow, "csv", top_n=1, previous=clean)
+            self.assertEqual(counts, (50, 1, 0))
+
+            jsonl_path = os.path.join(tmp, "siswa.jsonl")
+            student = json.dumps({**first, "id": "s0", "interests": sorted(first["interests"])}).encode("utf-8")
+            with open(jsonl_path, "wb") as handle:
+                handle.write(codecs.BOM_UTF8 + student + b"\n\xff\xfe{}\n" + student + b"\n")
+            encoded = os.path.join(tmp, "encoded.jsonl")
+            self.assertEqual(run_batch_job(self.recommender, jsonl_path, encoded, "jsonl"), (2, 1, 0))
+            with open(encoded, encoding="utf-8") as handle:
+                results = [json.loads(line) for line in handle]
+            self.assertEqual([r["id"] for r in results], ["s0", 2, "s0"])
+            self.assertIn("UTF-8", results[1]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()